@@ -0,0 +1,178 @@
+import asyncio
+import os
+import re
+from typing import Awaitable, Callable
+
+from a2wsgi import WSGIMiddleware
+from itsdangerous import BadSignature
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, Response, StreamingResponse
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import http_date, parse_accept_header, parse_date, parse_etags
+
+from contacts import Archiver, get_engine, next_cursor, page_size
+from contacts_async import AsyncContact, dispose_async_engine
+from events import AsyncSubscription, broker
+from index import (CONTACTS_REPRESENTATIONS, EVENT_KEEPALIVE, app as flask_app, cache_validators, compress_body,
+                   event_channels, event_message, job_message)
+
+# ========================================================
+# ASGI App
+# ========================================================
+# Serve with `uvicorn asgi:app`. The polled and read-heavy routes below run natively on the event loop,
+# so idle htmx polls cost a coroutine rather than a thread; every other route of index.py is handed to
+# the Flask app through a WSGI bridge and behaves exactly as it does under a WSGI server.
+
+ASGI_WSGI_WORKERS = int(os.environ.get("ASGI_WSGI_WORKERS", 10))
+
+wsgi_app = WSGIMiddleware(flask_app, workers=ASGI_WSGI_WORKERS)
+
+
+def flask_session(request: Request) -> dict:
+    # Read the signed Flask session cookie so archive polling finds the same job as the Flask routes
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    cookie: str | None = request.cookies.get(flask_app.config["SESSION_COOKIE_NAME"])
+    if serializer is None or not cookie:
+        return {}
+    try:
+        return serializer.loads(cookie, max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+    except BadSignature:
+        return {}
+
+
+async def json_endpoint(request: Request, load: Callable[[], Awaitable[tuple[object, int]]],
+                        representation: str = "") -> Response:
+    # Same validators and compression as the Flask JSON API, see conditional() in index.py
+    full_path: str = f"{request.url.path}?{request.url.query}"
+    etag, last_modified, fresh = cache_validators(full_path=full_path,
+                                                  if_none_match=parse_etags(request.headers.get("if-none-match")),
+                                                  if_modified_since=parse_date(request.headers.get("if-modified-since")),
+                                                  representation=representation)
+    headers: dict[str, str] = {"ETag": f'"{etag}"', "Last-Modified": http_date(last_modified),
+                               "Cache-Control": "no-cache"}
+    vary: list[str] = ["Accept"] if representation else []
+    if fresh:
+        return Response(status_code=304, headers={**headers, "Vary": ", ".join(vary)} if vary else headers)
+
+    data, status = await load()
+    body: bytes = (flask_app.json.dumps(data, separators=(",", ":")) + "\n").encode()
+    if status != 200:
+        return Response(content=body, status_code=status, media_type="application/json")
+    body, encoding = compress_body(body=body, accept_encodings=parse_accept_header(request.headers.get("accept-encoding")))
+    if encoding:
+        headers.update({"Content-Encoding": encoding, "ETag": f'"{etag}-{encoding}"'})
+        vary.append("Accept-Encoding")
+    if vary:
+        headers["Vary"] = ", ".join(vary)
+    return Response(content=body, status_code=200, media_type="application/json", headers=headers)
+
+
+async def contacts_count(request: Request) -> Response | None:
+    count: int = await AsyncContact.count()
+    return HTMLResponse(content="(" + str(object=count) + " total Contacts)")
+
+
+async def archive_status(request: Request) -> Response | None:
+    archiver: Archiver = await run_in_threadpool(Archiver.get, flask_session(request).get("archive_job"))
+    template = flask_app.jinja_env.get_template("archive_ui.html")
+    return HTMLResponse(content=template.render(archiver=archiver))
+
+
+async def events(request: Request) -> Response | None:
+    # Same stream as /events in index.py, but an open connection costs a coroutine instead of a WSGI thread
+    archive_job: str | None = (flask_session(request).get("archive_job", "")
+                               if request.query_params.get("channel") == "archive" else None)
+    last_event_id: str = request.headers.get("last-event-id", "")
+    channels: set[str] = event_channels(archive_job=archive_job)
+    subscription = broker.subscribe(AsyncSubscription(channels=channels, loop=asyncio.get_running_loop()))
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            if archive_job is not None:
+                message, done = await run_in_threadpool(job_message, archive_job)
+                yield message
+                if done:
+                    return
+            if last_event_id.isdigit():
+                for event in await run_in_threadpool(broker.since, int(last_event_id), channels):
+                    message, _ = event_message(event=event)
+                    if message:
+                        yield message
+            while True:
+                event = await subscription.get_async(timeout=EVENT_KEEPALIVE)
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                message, done = await run_in_threadpool(event_message, event)
+                if message:
+                    yield message
+                if done:
+                    return
+        finally:
+            broker.unsubscribe(subscription)
+
+    return StreamingResponse(content=stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+async def json_contacts(request: Request) -> Response | None:
+    accept = parse_accept_header(request.headers.get("accept"), MIMEAccept)
+    representation: str | None = accept.best_match(CONTACTS_REPRESENTATIONS)
+    if representation == "application/x-ndjson":
+        # The streaming NDJSON export stays on the Flask side
+        return None
+
+    async def load() -> tuple[object, int]:
+        size: int = page_size(request.query_params.get("size"))
+        contacts_set = await AsyncContact.all(after=request.query_params.get("after"), size=size)
+        return {"contacts": [c.to_dict() for c in contacts_set],
+                "next": next_cursor(contacts=contacts_set, size=size)}, 200
+
+    return await json_endpoint(request=request, load=load, representation=representation or "")
+
+
+async def json_contacts_view(request: Request, contact_id: str) -> Response | None:
+    async def load() -> tuple[object, int]:
+        contact = await AsyncContact.find(id_=int(contact_id))
+        if contact:
+            return contact.to_dict(), 200
+        return {'error': 'Contact not found'}, 404
+
+    return await json_endpoint(request=request, load=load)
+
+
+ROUTES: list[tuple[re.Pattern, Callable[..., Awaitable[Response | None]]]] = [
+    (re.compile(r"^/contacts/count$"), contacts_count),
+    (re.compile(r"^/contacts/archive$"), archive_status),
+    (re.compile(r"^/events$"), events),
+    (re.compile(r"^/api/v0/contacts$"), json_contacts),
+    (re.compile(r"^/api/v0/contacts/(?P<contact_id>\d+)$"), json_contacts_view),
+]
+
+
+async def app(scope, receive, send) -> None:
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                # Creates the engine, and with AUTO_MIGRATE the tables, before the native routes read them
+                await run_in_threadpool(get_engine)
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await dispose_async_engine()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] == "http" and scope["method"] == "GET":
+        for pattern, endpoint in ROUTES:
+            match = pattern.match(scope["path"])
+            if match:
+                response: Response | None = await endpoint(Request(scope, receive), **match.groupdict())
+                if response is not None:
+                    await response(scope, receive, send)
+                    return
+                break
+
+    await wsgi_app(scope, receive, send)
@@ -0,0 +1,366 @@
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Benchmarks
+# ========================================================
+# Seeds a SQLite database per size, then drives the real app through the Flask test client and through a
+# threaded HTTP load generator. Every size runs in its own process so the app binds to that size's
+# database and peak RSS is measured per size.
+#
+#   python bench/bench.py --sizes 10000 100000 --output results.json
+#   python bench/bench.py --sizes 10000 --save-baseline      # store bench/baseline.json
+#   python bench/bench.py --sizes 10000 --baseline bench/baseline.json
+#   python bench/bench.py --sizes 10000 --requests 0 --heavy-requests 0   # cold start only
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT, "bench", "baseline.json")
+DATA_DIR = os.environ.get("BENCH_DIR", os.path.join(tempfile.gettempdir(), "contact_app_bench"))
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+SAMPLE_SIZE = 200
+
+
+def configure(size: int, data_dir: str, cache: bool) -> None:
+    # Must run before the app is imported: the app modules read these settings at import time
+    os.environ["CONNECTION_STRING"] = "sqlite:///" + os.path.join(data_dir, f"contacts-{size}.db")
+    os.environ["JOB_DB_PATH"] = os.path.join(data_dir, f"jobs-{size}.db")
+    os.environ["JOB_DIR"] = os.path.join(data_dir, f"jobs-{size}")
+    os.environ["CACHE_BACKEND"] = "memory"
+    if not cache:
+        os.environ["CACHE_MAX_ENTRIES"] = "0"
+    sys.path.insert(0, ROOT)
+
+
+def peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def seed(size: int) -> dict:
+    from contacts import Contact
+    from index import generate_contacts
+
+    started = time.perf_counter()
+    # Generated emails can collide and bulk_insert skips duplicates, so top up until the size is reached
+    count = Contact.count()
+    while count < size:
+        Contact.bulk_insert(contacts=generate_contacts(count=size - count))
+        count = Contact.count()
+    return {"contacts": count, "seed_seconds": round(time.perf_counter() - started, 2)}
+
+
+def summarize(samples: list[float], errors: int, elapsed: float) -> dict:
+    if not samples:
+        return {"requests": 0, "errors": errors}
+    ordered = sorted(samples)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "p50_ms": round(ordered[int(0.50 * (len(ordered) - 1))] * 1000, 3),
+        "p99_ms": round(ordered[int(0.99 * (len(ordered) - 1))] * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "throughput_rps": round(len(samples) / elapsed, 1) if elapsed else None,
+    }
+
+
+class Scenarios:
+    def __init__(self, size: int) -> None:
+        from contacts import Contact, contacts_table, encode_cursor, execute_with_retry
+        from sqlalchemy import func, select
+
+        # Sample real ids and names up front so requests spread over the whole table, like real traffic
+        query = select(contacts_table.c.id, contacts_table.c.last).order_by(func.random()).limit(SAMPLE_SIZE)
+        rows = execute_with_retry(query).all()
+        self.ids: list[int] = [row.id for row in rows] or [1]
+        self.names: list[str] = [row.last for row in rows if row.last] or ["a"]
+        self.cursors: list[str] = [encode_cursor(contact_id) for contact_id in self.ids]
+        self.size: int = size
+        self.count: Callable[[], int] = Contact.count
+
+    def light(self) -> dict[str, Callable[[], tuple[str, str, dict]]]:
+        return {
+            "contacts": lambda: ("GET", "/contacts", {}),
+            "contacts_page": lambda: ("GET", f"/contacts?after={random.choice(self.cursors)}",
+                                      {"HX-Trigger": "load-more"}),
+            "search": lambda: ("GET", f"/contacts?q={random.choice(self.names)}", {"HX-Trigger": "search"}),
+            "count": lambda: ("GET", "/contacts/count", {}),
+            "api_list": lambda: ("GET", f"/api/v0/contacts?after={random.choice(self.cursors)}", {}),
+            "api_view": lambda: ("GET", f"/api/v0/contacts/{random.choice(self.ids)}", {}),
+        }
+
+    @staticmethod
+    def heavy() -> dict[str, Callable[[], tuple[str, str, dict]]]:
+        return {
+            "archive_stream": lambda: ("GET", "/contacts/archive/file", {"Accept-Encoding": "gzip"}),
+        }
+
+
+def archive_job(request: Callable[..., tuple[int, bytes, dict]]) -> tuple[int, bytes, dict]:
+    # Start an archive job, poll it like the htmx UI does, then download and clear it
+    status, body, headers = request("POST", "/contacts/archive", {})
+    cookie = {"Cookie": headers["set-cookie"].split(";")[0]} if headers.get("set-cookie") else {}
+    while b"Creating Archive" in body:
+        time.sleep(0.05)
+        status, body, _ = request("GET", "/contacts/archive", cookie)
+    if status != 200 or b"archive/file" not in body:
+        return 500, body, {}
+    status, body, headers = request("GET", "/contacts/archive/file", cookie)
+    request("DELETE", "/contacts/archive", cookie)
+    return status, body, headers
+
+
+def client_request(client) -> Callable[..., tuple[int, bytes, dict]]:
+    def request(method: str, path: str, headers: dict) -> tuple[int, bytes, dict]:
+        response = client.open(path, method=method, headers=headers)
+        body = response.get_data()
+        return response.status_code, body, {key.lower(): value for key, value in response.headers.items()}
+    return request
+
+
+def http_request(port: int) -> Callable[..., tuple[int, bytes, dict]]:
+    def request(method: str, path: str, headers: dict) -> tuple[int, bytes, dict]:
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+        try:
+            connection.request(method, path, headers=headers)
+            response = connection.getresponse()
+            body = response.read()
+            return response.status, body, {key.lower(): value for key, value in response.getheaders()}
+        finally:
+            connection.close()
+    return request
+
+
+def drive(request: Callable[..., tuple[int, bytes, dict]], make: Callable[[], tuple[str, str, dict]] | None,
+          requests: int, concurrency: int, job: bool = False) -> dict:
+    samples: list[float] = []
+    errors: list[int] = [0]
+    remaining: list[int] = [requests]
+    lock = threading.Lock()
+
+    def worker() -> None:
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            started = time.perf_counter()
+            try:
+                status, _, _ = archive_job(request) if job else request(*make())
+                ok = status < 400
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    samples.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(samples=samples, errors=errors[0], elapsed=time.perf_counter() - started)
+
+
+def cold_start() -> dict:
+    # Runs in a fresh interpreter: import the app and serve one page, as a serverless cold start would
+    started = time.perf_counter()
+    from index import app
+    imported = time.perf_counter()
+    status = app.test_client().get("/contacts").status_code
+    finished = time.perf_counter()
+    return {"status": status, "import_ms": round((imported - started) * 1000, 1),
+            "first_response_ms": round((finished - imported) * 1000, 1),
+            "total_ms": round((finished - started) * 1000, 1)}
+
+
+def run_cold_starts(size: int, args: argparse.Namespace) -> dict:
+    samples: list[dict] = []
+    for _ in range(args.cold_starts):
+        started = time.perf_counter()
+        sample = run_phase(phase="cold", size=size, args=args)
+        sample["process_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        samples.append(sample)
+    return {key: round(statistics.median(sample[key] for sample in samples), 1)
+            for key in ("import_ms", "first_response_ms", "total_ms", "process_ms")}
+
+
+def run_size(size: int, args: argparse.Namespace) -> dict:
+    from werkzeug.serving import make_server
+    from index import app
+
+    scenarios = Scenarios(size=size)
+    result: dict = {"contacts": scenarios.count(), "client": {}, "http": {}}
+
+    client = app.test_client()
+    request = client_request(client)
+    for name, make in scenarios.light().items():
+        drive(request=request, make=make, requests=args.warmup, concurrency=1)
+        result["client"][name] = drive(request=request, make=make, requests=args.requests, concurrency=1)
+    for name, make in scenarios.heavy().items():
+        result["client"][name] = drive(request=request, make=make, requests=args.heavy_requests, concurrency=1)
+    result["client"]["archive_job"] = drive(request=request, make=None, requests=args.heavy_requests,
+                                            concurrency=1, job=True)
+
+    # Keep the per-request access log out of the measurements
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        request = http_request(port=server.server_port)
+        for name, make in scenarios.light().items():
+            result["http"][name] = drive(request=request, make=make, requests=args.requests,
+                                         concurrency=args.concurrency)
+        for name, make in scenarios.heavy().items():
+            result["http"][name] = drive(request=request, make=make, requests=args.heavy_requests,
+                                         concurrency=min(args.concurrency, args.heavy_requests))
+    finally:
+        server.shutdown()
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions: list[str] = []
+    for size, current in results["results"].items():
+        previous = baseline.get("results", {}).get(size)
+        if not previous:
+            continue
+        for mode in ("client", "http"):
+            for name, stats in current.get(mode, {}).items():
+                before = previous.get(mode, {}).get(name)
+                if not before or not stats.get("requests") or not before.get("requests"):
+                    continue
+                label = f"{size} {mode} {name}"
+                for metric in ("p50_ms", "p99_ms"):
+                    if stats[metric] > before[metric] * (1 + tolerance):
+                        regressions.append(f"{label} {metric}: {before[metric]} -> {stats[metric]}")
+                if (stats.get("throughput_rps") and before.get("throughput_rps")
+                        and stats["throughput_rps"] < before["throughput_rps"] * (1 - tolerance)):
+                    regressions.append(f"{label} throughput_rps: {before['throughput_rps']} -> "
+                                       f"{stats['throughput_rps']}")
+        for metric, value in current.get("cold_start", {}).items():
+            before = previous.get("cold_start", {}).get(metric)
+            if before and value > before * (1 + tolerance):
+                regressions.append(f"{size} cold_start {metric}: {before} -> {value}")
+        rss, rss_before = current.get("peak_rss_mb"), previous.get("peak_rss_mb")
+        if rss and rss_before and rss > rss_before * (1 + tolerance):
+            regressions.append(f"{size} peak_rss_mb: {rss_before} -> {rss}")
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the contact app against seeded SQLite databases.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--requests", type=int, default=200, help="requests per light scenario")
+    parser.add_argument("--heavy-requests", type=int, default=3, help="requests per archive scenario")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--cold-starts", type=int, default=5, help="fresh processes timed to first response")
+    parser.add_argument("--concurrency", type=int, default=8, help="HTTP load generator threads")
+    parser.add_argument("--no-cache", action="store_true", help="disable the result cache")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--output", help="write results JSON here instead of stdout")
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument("--save-baseline", action="store_true", help=f"also write results to {BASELINE_PATH}")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    # Internal: run one phase for one size in this process and write its JSON to the given path
+    parser.add_argument("--phase", choices=["seed", "run", "cold"], help=argparse.SUPPRESS)
+    parser.add_argument("--result-path", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def run_phase(phase: str, size: int, args: argparse.Namespace) -> dict:
+    command = [sys.executable, os.path.abspath(__file__), "--phase", phase, "--sizes", str(size),
+               "--requests", str(args.requests), "--heavy-requests", str(args.heavy_requests),
+               "--warmup", str(args.warmup), "--concurrency", str(args.concurrency), "--data-dir", args.data_dir]
+    if args.no_cache:
+        command.append("--no-cache")
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as handle:
+        result_path = handle.name
+    try:
+        subprocess.run(command + ["--result-path", result_path], check=True, stdout=sys.stderr)
+        with open(result_path) as file:
+            return json.load(file)
+    finally:
+        os.remove(result_path)
+
+
+def main() -> int:
+    args = parse_args()
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    if args.phase:
+        size = args.sizes[0]
+        configure(size=size, data_dir=args.data_dir, cache=not args.no_cache)
+        if args.phase == "seed":
+            result = seed(size=size)
+        elif args.phase == "cold":
+            result = cold_start()
+        else:
+            result = run_size(size=size, args=args)
+        with open(args.result_path, "w") as file:
+            json.dump(result, file)
+        return 0
+
+    results: dict = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"requests": args.requests, "heavy_requests": args.heavy_requests,
+                     "concurrency": args.concurrency, "cache": not args.no_cache},
+        "results": {},
+    }
+    for size in args.sizes:
+        print(f"Seeding {size} contacts...", file=sys.stderr)
+        seeded = run_phase(phase="seed", size=size, args=args)
+        print(f"Benchmarking {size} contacts...", file=sys.stderr)
+        results["results"][str(size)] = {"seed_seconds": seeded["seed_seconds"], **run_phase("run", size, args)}
+        if args.cold_starts:
+            results["results"][str(size)]["cold_start"] = run_cold_starts(size=size, args=args)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w") as file:
+            file.write(output + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results=results, baseline=json.load(file), tolerance=args.tolerance)
+        for line in regressions:
+            print("Regression: " + line, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
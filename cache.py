@@ -0,0 +1,176 @@
+import json
+import os
+import pickle
+import sqlite3
+import tempfile
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock
+from typing import Iterator
+
+# Result Cache
+# ========================================================
+# Bounded LRU for query results and rendered fragments. Every key embeds the current data version, and
+# every write bumps it, so entries cached before a write are not served again. The version and the time of
+# the last write live in a small SQLite file every worker process on the host shares, whichever backend
+# holds the entries, so a write in one worker invalidates the others' entries and ETags and Last-Modified
+# agree between workers and only change on writes. The "memory" backend keeps entries per process; the
+# "sqlite" backend shares them too, at the cost of a file read per lookup. CACHE_TTL optionally caps how
+# long a memory entry is served; 0 keeps entries until they are evicted or a write supersedes them.
+
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", 32 * 1024 * 1024))
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 10000))
+CACHE_TTL = float(os.environ.get("CACHE_TTL", 0))
+CACHE_PATH = os.environ.get("CACHE_PATH", os.path.join(tempfile.gettempdir(), "contact_app_cache.db"))
+
+
+@contextmanager
+def connect(path: str) -> Iterator[sqlite3.Connection]:
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+    try:
+        yield connection
+    finally:
+        connection.close()
+
+
+class VersionStore:
+    def __init__(self, path: str = CACHE_PATH) -> None:
+        self.path: str = path
+        with connect(self.path) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            connection.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('version', 0)")
+            connection.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('changed_at', ?)", (time.time(),))
+
+    def version(self) -> int:
+        with connect(self.path) as connection:
+            return connection.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()[0]
+
+    def changed_at(self) -> float:
+        with connect(self.path) as connection:
+            return connection.execute("SELECT value FROM meta WHERE name = 'changed_at'").fetchone()[0]
+
+    def bump(self) -> int:
+        with connect(self.path) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute("UPDATE meta SET value = ? WHERE name = 'changed_at'", (time.time(),))
+            version = connection.execute(
+                "UPDATE meta SET value = value + 1 WHERE name = 'version' RETURNING value").fetchone()[0]
+            connection.execute("COMMIT")
+            return version
+
+
+class MemoryCache:
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES,
+                 ttl: float = CACHE_TTL, versions: VersionStore | None = None) -> None:
+        self.max_entries: int = max_entries
+        self.max_bytes: int = max_bytes
+        self.ttl: float = ttl
+        self.versions: VersionStore = versions or VersionStore()
+        self._entries: OrderedDict[str, tuple[object, int, float]] = OrderedDict()
+        self._bytes: int = 0
+        self._lock: Lock = Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def key(self, *parts: object) -> str:
+        return json.dumps([self.version(), *parts], default=str)
+
+    def version(self) -> int:
+        return self.versions.version()
+
+    def version_tag(self) -> str:
+        return str(self.version())
+
+    def changed_at(self) -> float:
+        return self.versions.changed_at()
+
+    def bump_version(self) -> int:
+        return self.versions.bump()
+
+    def get(self, key: str) -> object | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if self.ttl > 0 and time.monotonic() - entry[2] > self.ttl:
+                self._bytes -= self._entries.pop(key)[1]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: str, value: object) -> None:
+        size = len(pickle.dumps(value))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "version": self.version(), "entries": len(self._entries),
+                "bytes": self._bytes, "ttl": self.ttl, "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions}
+
+
+class SQLiteCache(MemoryCache):
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = CACHE_MAX_ENTRIES,
+                 max_bytes: int = CACHE_MAX_BYTES) -> None:
+        super().__init__(max_entries=max_entries, max_bytes=max_bytes, ttl=0, versions=VersionStore(path=path))
+        self.path: str = path
+        with connect(self.path) as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                               "size INTEGER NOT NULL, used REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+
+    def get(self, key: str) -> object | None:
+        with connect(self.path) as connection:
+            row = connection.execute("UPDATE entries SET used = ? WHERE key = ? RETURNING value",
+                                     (time.time(), key)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return pickle.loads(row[0])
+
+    def set(self, key: str, value: object) -> None:
+        data = pickle.dumps(value)
+        if len(data) > self.max_bytes:
+            return
+        with connect(self.path) as connection:
+            connection.execute("INSERT OR REPLACE INTO entries (key, value, size, used) VALUES (?, ?, ?, ?)",
+                               (key, data, len(data), time.time()))
+            entries, size = connection.execute("SELECT count(*), coalesce(sum(size), 0) FROM entries").fetchone()
+            if entries > self.max_entries or size > self.max_bytes:
+                # Drop the least recently used quarter in one statement rather than row by row
+                evicted = connection.execute(
+                    "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY used LIMIT ?)",
+                    (max(entries // 4, entries - self.max_entries),)).rowcount
+                self.evictions += evicted
+
+    def stats(self) -> dict:
+        with connect(self.path) as connection:
+            entries, size = connection.execute("SELECT count(*), coalesce(sum(size), 0) FROM entries").fetchone()
+        return {"backend": "sqlite", "version": self.version(), "entries": entries, "bytes": size,
+                "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+def make_cache(backend: str = CACHE_BACKEND) -> MemoryCache:
+    if backend == "sqlite":
+        return SQLiteCache()
+    return MemoryCache()
+
+
+cache = make_cache()
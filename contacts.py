@@ -1,30 +1,237 @@
+import base64
+import binascii
+import contextlib
+import csv
+import io
 import json
+import logging
 import os
-import tempfile
+import re
 import time
-from random import random
-from threading import Thread
-from typing import override
+from datetime import datetime, timezone
+from itertools import batched
+from threading import Lock, RLock, Thread
+from typing import Callable, Iterable, Iterator, NamedTuple, override
 
 from dotenv import load_dotenv
-from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import (Column, DateTime, Index, Integer, MetaData, String, Table, bindparam, create_engine, event,
+                        func, inspect, select, text)
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql import Select
+from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.orm.session import Session
-from sqlalchemy.exc import PendingRollbackError
-from tenacity import retry, stop_after_attempt, wait_exponential
+from sqlalchemy.exc import IntegrityError, OperationalError, PendingRollbackError
+from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, wait_exponential
+
+from cache import cache
+from events import broker
+from jobs import JOB_DIR, Job, job_runner, job_store
+from metrics import instrument_engine, instrument_session, metrics, record_retry
+from normalize import email_lower, phone_digits, phone_query_digits
 
 # Contact Model
 # ========================================================
 
-PAGE_SIZE = 100
-
 _ = load_dotenv()
 
+PAGE_SIZE = int(os.environ.get("PAGE_SIZE", 100))
+MAX_PAGE_SIZE = 1000
+COUNT_CACHE_TTL = float(os.environ.get("COUNT_CACHE_TTL", 60))
+COUNT_APPROXIMATE = os.environ.get("COUNT_APPROXIMATE", "").lower() in ("1", "true", "yes")
+EMAIL_INDEX = os.environ.get("EMAIL_INDEX", "").lower() in ("1", "true", "yes")
+EMAIL_INDEX_TTL = float(os.environ.get("EMAIL_INDEX_TTL", 300))
+DELETE_BATCH_SIZE = 500
+INSERT_BATCH_SIZE = int(os.environ.get("INSERT_BATCH_SIZE", 1000))
+IMPORT_MAX_ERRORS = int(os.environ.get("IMPORT_MAX_ERRORS", 1000))
+ARCHIVE_CHUNK_SIZE = int(os.environ.get("ARCHIVE_CHUNK_SIZE", 1000))
+CONTACT_COLUMNS = ["id", "first", "last", "phone", "email"]
+CONTACT_FIELDS = ["first", "last", "phone", "email"]
+# Import headers may also spell the names out
+IMPORT_FIELDS = CONTACT_FIELDS + ["first_name", "last_name"]
+ARCHIVE_COLUMNS = CONTACT_COLUMNS
+BATCH_MAX_OPERATIONS = int(os.environ.get("BATCH_MAX_OPERATIONS", 1000))
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "1").lower() in ("1", "true", "yes")
+# Check and upgrade the schema once per process, on first database use; deployments that run
+# `flask --app index migrate` ahead of time can switch this off and skip the round trips on cold start
+AUTO_MIGRATE = os.environ.get("AUTO_MIGRATE", "1").lower() in ("1", "true", "yes")
+
+logger = logging.getLogger("contact_app.contacts")
+
+
+def engine_options(url: str) -> dict:
+    options: dict = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    parsed = make_url(url)
+    if not issubclass(parsed.get_dialect().get_pool_class(parsed), QueuePool):
+        # In-memory SQLite, and aiosqlite files on SQLAlchemy 2.0, use pools that take no sizing options
+        return options
+    options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    return options
+
+
 # PostgreSQL database connection
 db_url = os.environ["CONNECTION_STRING"]
-engine = create_engine(db_url)
-Session = sessionmaker(bind=engine)
-session = Session()
+_engine: Engine | None = None
+_engine_lock: RLock = RLock()
+
+
+def get_engine() -> Engine:
+    # Created on first use rather than at import, so a cold start only pays for what the request needs
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine_ = create_engine(db_url, **engine_options(db_url))
+                instrument_engine(engine_)
+                if AUTO_MIGRATE:
+                    migrate(engine_=engine_, background=True)
+                _engine = engine_
+    return _engine
+
+
+# Read Replicas
+# ========================================================
+# READ_CONNECTION_STRINGS is a comma-separated list of replica URLs. Plain SELECTs made through the session
+# go to the replicas in turn; everything else, and any read shortly after this session wrote, goes to the
+# primary. A replica that fails its health check or a statement is skipped until REPLICA_RETRY_INTERVAL has
+# passed, and when none is available reads fall back to the primary.
+
+READ_CONNECTION_STRINGS = [url.strip() for url in os.environ.get("READ_CONNECTION_STRINGS", "").split(",")
+                           if url.strip()]
+REPLICA_CHECK_INTERVAL = float(os.environ.get("REPLICA_CHECK_INTERVAL", 10))
+REPLICA_RETRY_INTERVAL = float(os.environ.get("REPLICA_RETRY_INTERVAL", 30))
+# Upper bound on replication lag: reads this many seconds after a write stay on the primary
+READ_YOUR_WRITES_SECONDS = float(os.environ.get("READ_YOUR_WRITES_SECONDS", 5))
+
+
+class Replica:
+    def __init__(self, url: str) -> None:
+        self.url: str = url
+        self._engine: Engine | None = None
+        self._checked: float = 0
+        self._down_until: float = 0
+        self._lock: Lock = Lock()
+
+    def engine(self) -> Engine:
+        with self._lock:
+            if self._engine is None:
+                engine_ = create_engine(self.url, **engine_options(self.url))
+                instrument_engine(engine_)
+
+                @event.listens_for(engine_, "handle_error")
+                def handle_error(context) -> None:
+                    if context.is_disconnect or isinstance(context.original_exception, OperationalError):
+                        self.mark_down()
+
+                self._engine = engine_
+            return self._engine
+
+    def mark_down(self) -> None:
+        self._down_until = time.monotonic() + REPLICA_RETRY_INTERVAL
+
+    def available(self) -> bool:
+        now = time.monotonic()
+        if now < self._down_until:
+            return False
+        if now - self._checked < REPLICA_CHECK_INTERVAL:
+            return True
+        self._checked = now
+        try:
+            # Also proves the schema is there, which a bare SELECT 1 would not
+            with self.engine().connect() as connection:
+                connection.execute(select(contacts_table.c.id).limit(1))
+        except Exception as e:
+            logger.warning("Replica health check failed for %s: %s", make_url(self.url), e)
+            self.mark_down()
+            return False
+        return True
+
+    def stats(self) -> dict:
+        stats: dict = {"url": make_url(self.url).render_as_string(hide_password=True),
+                       "available": time.monotonic() >= self._down_until}
+        if self._engine is not None:
+            stats["status"] = self._engine.pool.status()
+        return stats
+
+
+class ReplicaSet:
+    def __init__(self, urls: list[str]) -> None:
+        self.replicas: list[Replica] = [Replica(url=url) for url in urls]
+        self._next: int = 0
+        self._lock: Lock = Lock()
+
+    def engine(self) -> Engine | None:
+        # Round robin over the replicas that pass their health check
+        for _ in self.replicas:
+            with self._lock:
+                replica = self.replicas[self._next % len(self.replicas)]
+                self._next += 1
+            if replica.available():
+                return replica.engine()
+        return None
+
+
+replicas = ReplicaSet(urls=READ_CONNECTION_STRINGS)
+
+
+def get_read_engine() -> Engine:
+    # For reads that open their own connection (exports, archives); session reads are routed by get_bind
+    return replicas.engine() or get_engine()
+
+
+def pin_primary(session_: Session | scoped_session | None = None) -> None:
+    # Send this session's reads to the primary until it is closed, for read-modify-write sequences
+    (session_ or session).info["pinned"] = True
+
+
+def reads_primary(session_: Session | scoped_session | None = None) -> bool:
+    # Pinned, or close enough to its own last write that a replica may not have it yet
+    info: dict = (session_ or session).info
+    return bool(info.get("pinned")) or time.time() - info.get("wrote_at", 0) < READ_YOUR_WRITES_SECONDS
+
+
+def result_cache_readable() -> bool:
+    # The result cache is shared by every session, so one that must see its own writes goes past it
+    return not replicas.replicas or not reads_primary()
+
+
+def result_cache_writable() -> bool:
+    # A replica can lag a write by up to READ_YOUR_WRITES_SECONDS; its answer cached under the version that
+    # write bumped would keep serving the old rows after the replica caught up
+    if not replicas.replicas:
+        return True
+    return not reads_primary() and time.time() - cache.changed_at() >= READ_YOUR_WRITES_SECONDS
+
+
+class EngineSession(Session):
+    def get_bind(self, mapper=None, clause=None, **kwargs) -> Engine:
+        if replicas.replicas and isinstance(clause, Select):
+            if not reads_primary(session_=self):
+                engine_ = replicas.engine()
+                if engine_ is not None:
+                    metrics.inc("db_reads_total", target="replica")
+                    return engine_
+            metrics.inc("db_reads_total", target="primary")
+        elif clause is None or getattr(clause, "is_dml", False):
+            # Inserts, updates, deletes and ORM flushes
+            self.info["wrote_at"] = time.time()
+        return get_engine()
+
+    @override
+    def close(self) -> None:
+        self.info.pop("pinned", None)
+        super().close()
+
+
+Session = sessionmaker(class_=EngineSession)
+instrument_session(Session)
+# One session per thread, removed at the end of each request (see index.py), so requests never share
+# a transaction; every module-level use of `session` goes through this registry
+session = scoped_session(Session)
 
 metadata = MetaData()
 contacts_table = Table('contacts', metadata,
@@ -32,19 +239,481 @@ contacts_table = Table('contacts', metadata,
                        Column('first', String),
                        Column('last', String),
                        Column('phone', String),
-                       Column('email', String, unique=True)
+                       Column('email', String, unique=True),
+                       Column('updated_at', DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
+                              onupdate=lambda: datetime.now(timezone.utc)),
+                       # Derived from phone and email on every write (see lookup_values) for indexed lookups
+                       Column('phone_digits', String),
+                       Column('email_lower', String),
+                       Index('contacts_updated_at', 'updated_at'),
+                       # Pattern ops serve both = and LIKE 'prefix%' whatever the database collation
+                       Index('contacts_phone_digits', 'phone_digits',
+                             postgresql_ops={'phone_digits': 'varchar_pattern_ops'}),
+                       Index('contacts_email_lower', 'email_lower',
+                             postgresql_ops={'email_lower': 'varchar_pattern_ops'})
                        )
+# Read queries select exactly these, in ContactRecord field order
+contact_columns = [contacts_table.c[name] for name in CONTACT_COLUMNS]
+
+
+def migrate(engine_: Engine | None = None, background: bool = False) -> None:
+    # Create missing tables and add missing columns, both cheap. Building indexes and filling new columns
+    # scans the table, so with background=True (AUTO_MIGRATE, on first database use) that part runs as a
+    # job instead of inside the request; `flask --app index migrate` does everything in the foreground
+    engine_ = engine_ or get_engine()
+    new_table = not inspect(engine_).has_table("contacts")
+    metadata.create_all(engine_)
+    existing = {column["name"] for column in inspect(engine_).get_columns("contacts")}
+    with engine_.begin() as connection:
+        for column in contacts_table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=engine_.dialect)
+                connection.execute(text(f"ALTER TABLE contacts ADD COLUMN {column.name} {column_type}"))
+    if background and not new_table:
+        if upgrade_pending(engine_=engine_):
+            _ = job_runner.submit(kind="migrate", target=lambda job: upgrade_data(engine_=engine_))
+    else:
+        upgrade_data(engine_=engine_)
+
+
+def upgrade_pending(engine_: Engine) -> bool:
+    indexes = {index["name"] for index in inspect(engine_).get_indexes("contacts")}
+    if any(index.name not in indexes for index in contacts_table.indexes):
+        return True
+    if engine_.dialect.name in ("sqlite", "postgresql") and not search_index.exists(engine_=engine_):
+        return True
+    with engine_.connect() as connection:
+        stale = select(contacts_table.c.id).where(
+            contacts_table.c.updated_at.is_(None) |
+            (contacts_table.c.email.is_not(None) & contacts_table.c.email_lower.is_(None))).limit(1)
+        return connection.execute(stale).first() is not None
+
+
+def upgrade_data(engine_: Engine) -> None:
+    with engine_.begin() as connection:
+        connection.execute(contacts_table.update().where(contacts_table.c.updated_at.is_(None))
+                           .values(updated_at=datetime.now(timezone.utc)))
+    backfill_lookups(engine_=engine_)
+    with engine_.begin() as connection:
+        for index in contacts_table.indexes:
+            index.create(bind=connection, checkfirst=True)
+    if search_index.install(engine_=engine_):
+        search_index.rebuild(engine_=engine_)
+
+
+def lookup_values(phone: str | None, email: str | None) -> dict[str, str | None]:
+    return {"phone_digits": phone_digits(phone) or None, "email_lower": email_lower(email) or None}
+
 
-# Create the table if it doesn't exist
-metadata.create_all(engine)
+def with_lookups(row: dict) -> dict:
+    return {**row, **lookup_values(phone=row.get("phone"), email=row.get("email"))}
 
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
+def backfill_lookups(engine_: Engine) -> None:
+    # Fill the lookup columns for rows written before they existed, without touching updated_at. One short
+    # transaction per batch, so writers are never held up for the whole table
+    statement = (contacts_table.update().where(contacts_table.c.id == bindparam("_id"))
+                 .values(phone_digits=bindparam("phone_digits"), email_lower=bindparam("email_lower"),
+                         updated_at=contacts_table.c.updated_at))
+    query = (select(contacts_table.c.id, contacts_table.c.phone, contacts_table.c.email)
+             .where((contacts_table.c.phone.is_not(None) & contacts_table.c.phone_digits.is_(None)) |
+                    (contacts_table.c.email.is_not(None) & contacts_table.c.email_lower.is_(None)))
+             .order_by(contacts_table.c.id).limit(INSERT_BATCH_SIZE))
+    last_id = 0
+    while True:
+        with engine_.begin() as connection:
+            rows = connection.execute(query.where(contacts_table.c.id > last_id)).all()
+            if not rows:
+                return
+            connection.execute(statement, [{"_id": row.id, **lookup_values(phone=row.phone, email=row.email)}
+                                           for row in rows])
+        last_id = rows[-1].id
+
+
+def page_size(value: int | str | None = None) -> int:
+    try:
+        size = PAGE_SIZE if value is None else int(value)
+    except ValueError:
+        size = PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def encode_cursor(value: int) -> str:
+    return base64.urlsafe_b64encode(str(value).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> int | None:
+    if not cursor:
+        return None
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode())
+    except (ValueError, binascii.Error):
+        return None
+
+
+def next_cursor(contacts: list["ContactRecord"], size: int, offset: int | None = None) -> str | None:
+    # A full page means there may be more rows after the last one we returned
+    if len(contacts) < size or contacts[-1].id is None:
+        return None
+    if offset is not None:
+        return encode_cursor(offset + len(contacts))
+    return encode_cursor(contacts[-1].id)
+
+
+# Search Index
+# ========================================================
+# FTS5 shadow table on SQLite, tsvector + pg_trgm indexes on PostgreSQL, LIKE scan anywhere else.
+
+# Queries that look like a phone number or an email skip full-text search for the indexed lookup columns
+PHONE_QUERY = re.compile(r"[\d\s().+-]+")
+EMAIL_QUERY = re.compile(r"[^@\s]+@[^@\s]*")
+FULL_EMAIL = re.compile(r"[^@\s]+@[^@\s]+\.[^@\s]+")
+SEARCH_DOCUMENT = "coalesce(first, '') || ' ' || coalesce(last, '') || ' ' || coalesce(phone, '') || ' ' || coalesce(email, '')"
+
+
+def prefix_match(column, prefix: str):
+    if get_engine().dialect.name == "sqlite":
+        # SQLite's LIKE is case-insensitive and can't use a plain index, but its BINARY collation orders by
+        # bytes, so this range is exactly LIKE 'prefix%' and is answered from the index
+        return (column >= prefix) & (column < prefix[:-1] + chr(ord(prefix[-1]) + 1))
+    # Linguistic collations (PostgreSQL's default) don't order by bytes, so a range can miss or over-match
+    # around punctuation; LIKE is exact and PostgreSQL answers it from the varchar_pattern_ops indexes
+    return column.like(re.sub(r"([%_\\])", r"\\\1", prefix) + "%", escape="\\")
+
+
+class SearchIndex:
+    def __init__(self) -> None:
+        # Unknown until installed or first looked up, see is_available()
+        self.available: bool | None = None
+
+    def is_available(self) -> bool:
+        if self.available is None:
+            self.available = self.exists(engine_=get_engine())
+        return self.available
+
+    @staticmethod
+    def exists(engine_: Engine) -> bool:
+        dialect = engine_.dialect.name
+        if dialect == "sqlite":
+            query = text("SELECT 1 FROM sqlite_master WHERE name = 'contacts_fts'")
+        elif dialect == "postgresql":
+            query = text("SELECT 1 FROM pg_indexes WHERE indexname = 'contacts_search_tsv'")
+        else:
+            return False
+        with engine_.connect() as connection:
+            return connection.execute(query).first() is not None
+
+    def install(self, engine_: Engine | None = None) -> bool:
+        engine_ = engine_ or get_engine()
+        dialect = engine_.dialect.name
+        try:
+            with engine_.begin() as connection:
+                if dialect == "sqlite":
+                    created = connection.execute(
+                        text("SELECT 1 FROM sqlite_master WHERE name = 'contacts_fts'")).first() is None
+                    connection.execute(text(
+                        "CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5("
+                        "first, last, phone, email, content='contacts', content_rowid='id')"))
+                    # Triggers keep the shadow table in step with every write path, single-row or bulk
+                    connection.execute(text(
+                        "CREATE TRIGGER IF NOT EXISTS contacts_fts_ai AFTER INSERT ON contacts BEGIN "
+                        "INSERT INTO contacts_fts(rowid, first, last, phone, email) "
+                        "VALUES (new.id, new.first, new.last, new.phone, new.email); END"))
+                    connection.execute(text(
+                        "CREATE TRIGGER IF NOT EXISTS contacts_fts_ad AFTER DELETE ON contacts BEGIN "
+                        "INSERT INTO contacts_fts(contacts_fts, rowid, first, last, phone, email) "
+                        "VALUES ('delete', old.id, old.first, old.last, old.phone, old.email); END"))
+                    connection.execute(text(
+                        "CREATE TRIGGER IF NOT EXISTS contacts_fts_au AFTER UPDATE ON contacts BEGIN "
+                        "INSERT INTO contacts_fts(contacts_fts, rowid, first, last, phone, email) "
+                        "VALUES ('delete', old.id, old.first, old.last, old.phone, old.email); "
+                        "INSERT INTO contacts_fts(rowid, first, last, phone, email) "
+                        "VALUES (new.id, new.first, new.last, new.phone, new.email); END"))
+                elif dialect == "postgresql":
+                    created = connection.execute(
+                        text("SELECT 1 FROM pg_indexes WHERE indexname = 'contacts_search_tsv'")).first() is None
+                    connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                    connection.execute(text(
+                        f"CREATE INDEX IF NOT EXISTS contacts_search_tsv ON contacts "
+                        f"USING gin (to_tsvector('simple', {SEARCH_DOCUMENT}))"))
+                    connection.execute(text(
+                        f"CREATE INDEX IF NOT EXISTS contacts_search_trgm ON contacts "
+                        f"USING gin (({SEARCH_DOCUMENT}) gin_trgm_ops)"))
+                else:
+                    self.available = False
+                    return False
+            self.available = True
+            return created
+        except Exception:
+            # No FTS5 / pg_trgm available: fall back to LIKE matching
+            logger.warning("Search index unavailable, falling back to LIKE matching", exc_info=True)
+            self.available = False
+            return False
+
+    def rebuild(self, engine_: Engine | None = None) -> None:
+        engine_ = engine_ or get_engine()
+        if not self.available:
+            self.install(engine_=engine_)
+        if not self.available:
+            return
+        with engine_.begin() as connection:
+            if engine_.dialect.name == "sqlite":
+                connection.execute(text("INSERT INTO contacts_fts(contacts_fts) VALUES ('rebuild')"))
+            elif engine_.dialect.name == "postgresql":
+                connection.execute(text("REINDEX INDEX contacts_search_tsv"))
+                connection.execute(text("REINDEX INDEX contacts_search_trgm"))
+
+    @staticmethod
+    def lookup(text_: str):
+        value = text_.strip()
+        if PHONE_QUERY.fullmatch(value):
+            digits = phone_query_digits(value)
+            return prefix_match(contacts_table.c.phone_digits, digits) if digits else None
+        if EMAIL_QUERY.fullmatch(value):
+            email = email_lower(value)
+            if FULL_EMAIL.fullmatch(email):
+                return contacts_table.c.email_lower == email
+            return prefix_match(contacts_table.c.email_lower, email)
+        return None
+
+    def query(self, text_: str, limit: int, offset: int = 0, lookup: bool = True) -> Select:
+        terms: list[str] = re.findall(r"\w+", text_)
+        query = select(*contact_columns)
+        if not terms:
+            return query.order_by(contacts_table.c.id).limit(limit).offset(offset)
+        condition = self.lookup(text_=text_) if lookup else None
+        if condition is not None:
+            return query.where(condition).order_by(contacts_table.c.id).limit(limit).offset(offset)
+
+        dialect = get_engine().dialect.name
+        if dialect == "sqlite" and self.is_available():
+            match = " ".join(f'"{term}"*' for term in terms)
+            query = (query.join(text("contacts_fts"), text("contacts_fts.rowid = contacts.id"))
+                     .where(text("contacts_fts MATCH :match").bindparams(match=match))
+                     .order_by(text("contacts_fts.rank"), contacts_table.c.id))
+        elif dialect == "postgresql" and self.is_available():
+            like_text = "%" + re.sub(r"([%_\\])", r"\\\1", text_) + "%"
+            ts_query = " & ".join(f"{term}:*" for term in terms)
+            query = (query.where(text(f"to_tsvector('simple', {SEARCH_DOCUMENT}) @@ to_tsquery('simple', :ts_query) "
+                                      f"OR ({SEARCH_DOCUMENT}) ILIKE :like_text")
+                                 .bindparams(ts_query=ts_query, like_text=like_text))
+                     .order_by(text(f"ts_rank(to_tsvector('simple', {SEARCH_DOCUMENT}), "
+                                    f"to_tsquery('simple', :ts_query)) DESC").bindparams(ts_query=ts_query),
+                               contacts_table.c.id))
+        else:
+            like_text = f'%{text_}%'
+            query = query.where(
+                contacts_table.c.first.like(like_text) |
+                contacts_table.c.last.like(like_text) |
+                contacts_table.c.phone.like(like_text) |
+                contacts_table.c.email.like(like_text)
+            ).order_by(contacts_table.c.id)
+        return query.limit(limit).offset(offset)
+
+
+search_index = SearchIndex()
+
+
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10),
+       retry=retry_if_not_exception_type(IntegrityError), before_sleep=record_retry)
 def execute_with_retry(query):
     return session.execute(query)
 
 
+def pool_stats() -> dict:
+    pool = get_engine().pool
+    stats: dict = {"pool": type(pool).__name__, "status": pool.status()}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+    if replicas.replicas:
+        stats["replicas"] = [replica.stats() for replica in replicas.replicas]
+    return stats
+
+
+# Contact Count
+# ========================================================
+# The total is cached for COUNT_CACHE_TTL seconds and adjusted in place by inserts and deletes,
+# so the count span is served from memory; the TTL bounds drift from writes made by other processes.
+
+
+class ContactCounter:
+    def __init__(self, ttl: float, approximate: bool = False) -> None:
+        self.ttl: float = ttl
+        self.approximate: bool = approximate
+        self._value: int | None = None
+        self._expires: float = 0
+        self._lock: Lock = Lock()
+
+    def peek(self) -> int | None:
+        value = self._value
+        if value is not None and time.monotonic() < self._expires:
+            return value
+        return None
+
+    def get(self) -> int:
+        value = self.peek()
+        if value is not None:
+            return value
+        with self._lock:
+            value = self.peek()
+            if value is None:
+                value = self.store(value=self._load())
+            return value
+
+    def store(self, value: int) -> int:
+        self._value = value
+        self._expires = time.monotonic() + self.ttl
+        return value
+
+    def bump(self, delta: int) -> None:
+        with self._lock:
+            if self._value is not None:
+                self._value = max(0, self._value + delta)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._value = None
+
+    def queries(self) -> list:
+        queries = []
+        if self.approximate and get_engine().dialect.name == "postgresql":
+            # Planner estimate, refreshed by VACUUM/ANALYZE; -1 means the table was never analyzed
+            queries.append(text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'contacts'::regclass"))
+        queries.append(select(func.count()).select_from(contacts_table))
+        return queries
+
+    def _load(self) -> int:
+        for query in self.queries():
+            value = execute_with_retry(query).scalar()
+            if value is not None and value >= 0:
+                return int(value)
+        return 0
+
+
+contact_counter = ContactCounter(ttl=COUNT_CACHE_TTL, approximate=COUNT_APPROXIMATE)
+
+
+def data_changed(delta: int = 0, action: str = "update", count: int = 1, ids: list[int] | None = None) -> None:
+    # Called after every committed write: keeps the cached count current, retires cached pages and tells
+    # connected browsers (see /events)
+    contact_counter.bump(delta)
+    _ = cache.bump_version()
+    if count:
+        broker.publish(channel="contacts", name="contacts", data={"action": action, "count": count, "ids": ids or []})
+
+
+# Email Index
+# ========================================================
+# Opt-in (EMAIL_INDEX=1) in-process set of known emails for live form validation. A miss means the email is
+# free without asking the database; a hit (possibly a since-deleted or changed email) is confirmed with one
+# indexed query. Writes from this process add to it, and a background thread reloads it every
+# EMAIL_INDEX_TTL seconds to pick up others. Requests never wait for a load: until the first one finishes
+# every email is a possible hit. The set holds every email in memory, which is why it is off by default.
+
+
+class EmailIndex:
+    def __init__(self, ttl: float) -> None:
+        self.ttl: float = ttl
+        self._emails: set[str] | None = None
+        self._expires: float = 0
+        # Emails written while a load runs, which its snapshot may have missed
+        self._pending: set[str] | None = None
+        self._lock: Lock = Lock()
+
+    def may_contain(self, email: str) -> bool:
+        emails = self._emails
+        if emails is None or time.monotonic() >= self._expires:
+            self.refresh()
+        return emails is None or email in emails
+
+    def refresh(self) -> None:
+        with self._lock:
+            if self._pending is not None:
+                return
+            self._pending = set()
+        Thread(target=self._load, daemon=True).start()
+
+    def _load(self) -> None:
+        emails: set[str] | None = None
+        try:
+            with get_engine().connect() as connection:
+                query = select(contacts_table.c.email).where(contacts_table.c.email.is_not(None))
+                emails = set(connection.execute(query).scalars())
+        except Exception:
+            logger.exception("Email index reload failed")
+        with self._lock:
+            if emails is not None:
+                self._emails = emails | self._pending
+            # A failed load is retried after the same interval rather than on the next request
+            self._expires = time.monotonic() + self.ttl
+            self._pending = None
+
+    def add(self, emails: Iterable[str | None]) -> None:
+        with self._lock:
+            added = {email for email in emails if email}
+            if self._emails is not None:
+                self._emails.update(added)
+            if self._pending is not None:
+                self._pending.update(added)
+
+
+email_index = EmailIndex(ttl=EMAIL_INDEX_TTL)
+
+
+UPSERT_DIALECTS = ("postgresql", "sqlite")
+
+
+def insert_statement(upsert: bool = False):
+    # Conflicts on email are skipped (or become updates) where the dialect can express it. Dialect modules
+    # are imported here so a cold start only loads the one in use
+    if get_engine().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+        statement = postgresql_insert(contacts_table)
+    elif get_engine().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        statement = sqlite_insert(contacts_table)
+    else:
+        return contacts_table.insert()
+    if upsert:
+        return statement.on_conflict_do_update(index_elements=["email"], set_={
+            "first": statement.excluded.first,
+            "last": statement.excluded.last,
+            "phone": statement.excluded.phone,
+            "phone_digits": statement.excluded.phone_digits,
+            "updated_at": statement.excluded.updated_at,
+        })
+    return statement.on_conflict_do_nothing(index_elements=["email"])
+
+
+def insert_rows(statement, rows: list[dict]) -> int:
+    # Rows inserted by a multi-row INSERT, leaving out those ON CONFLICT DO NOTHING skipped
+    dialect = get_engine().dialect
+    if dialect.insert_executemany_returning:
+        return len(session.execute(statement.returning(contacts_table.c.id), rows).all())
+    result = session.execute(statement, rows)
+    return result.rowcount if dialect.supports_sane_multi_rowcount and result.rowcount >= 0 else len(rows)
+
+
+class ContactRecord(NamedTuple):
+    # Read-only row for lists and search results: a tuple per contact, no instance dict and no errors
+    id: int
+    first: str | None
+    last: str | None
+    phone: str | None
+    email: str | None
+
+    def to_dict(self) -> dict:
+        return self._asdict()
+
+
+def to_records(rows: Iterable) -> list[ContactRecord]:
+    return [ContactRecord._make(row) for row in rows]
+
+
 class Contact:
+    __slots__ = ("id", "first", "last", "phone", "email", "_errors")
+
     def __init__(self, id_: int | None = None, first: str | None = None, last: str | None = None,
                  phone: str | None = None, email: str | None = None) -> None:
         self.id: int | None = id_
@@ -52,11 +721,21 @@ class Contact:
         self.last: str | None = last
         self.phone: str | None = phone
         self.email: str | None = email
-        self.errors: dict[str, str] = {}
+        self._errors: dict[str, str] | None = None
+
+    @property
+    def errors(self) -> dict[str, str]:
+        # Only the write path (forms, validation) ever needs this
+        if self._errors is None:
+            self._errors = {}
+        return self._errors
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in CONTACT_COLUMNS}
 
     @override
     def __str__(self) -> str:
-        return json.dumps(obj=self.__dict__, ensure_ascii=False)
+        return json.dumps(obj=self.to_dict(), ensure_ascii=False)
 
     def update(self, first: str, last: str, phone: str, email: str) -> None:
         self.first = first
@@ -65,15 +744,33 @@ class Contact:
         self.email = email
 
     def validate(self) -> bool:
+        # Uniqueness is enforced by the email constraint when saving, see save()
         if not self.email:
             self.errors['email'] = "Email Required"
             return False
-        query = session.query(contacts_table).filter(contacts_table.c.email == self.email,
-                                                     contacts_table.c.id != self.id)
-        existing_contact = query.first()
-        if existing_contact:
-            self.errors['email'] = "Email Must Be Unique"
+
+        return True
+
+    def validate_email(self) -> bool:
+        if not self.validate():
             return False
+        try:
+            if EMAIL_INDEX and not email_index.may_contain(email=self.email):
+                return True
+            query = select(contacts_table.c.id).where(contacts_table.c.email == self.email)
+            if self.id is not None:
+                query = query.where(contacts_table.c.id != self.id)
+            if execute_with_retry(query.limit(1)).first():
+                self.errors['email'] = "Email Must Be Unique"
+                return False
+        except PendingRollbackError:
+            session.rollback()
+            logger.exception("Contact.validate_email failed: an earlier error left the transaction unusable")
+        except Exception:
+            session.rollback()
+            logger.exception("Contact.validate_email failed")
+        finally:
+            session.close()  # Close the session
 
         return True
 
@@ -81,26 +778,34 @@ class Contact:
         if not self.validate():
             return False
 
+        created = self.id is None
         try:
-            if self.id is None:
+            if created:
                 query = contacts_table.insert().values(first=self.first, last=self.last, phone=self.phone,
-                                                       email=self.email)
+                                                       email=self.email,
+                                                       **lookup_values(phone=self.phone, email=self.email))
                 result = execute_with_retry(query)
                 self.id = result.inserted_primary_key[0]
             else:
-                query = contacts_table.update().where(contacts_table.c.id == self.id).values(first=self.first,
-                                                                                              last=self.last,
-                                                                                              phone=self.phone,
-                                                                                              email=self.email)
+                query = contacts_table.update().where(contacts_table.c.id == self.id).values(
+                    first=self.first, last=self.last, phone=self.phone, email=self.email,
+                    **lookup_values(phone=self.phone, email=self.email))
                 execute_with_retry(query)
             session.commit()
+            data_changed(delta=1 if created else 0, action="create" if created else "update", ids=[self.id])
+            email_index.add(emails=[self.email])
             return True
+        except IntegrityError:
+            session.rollback()
+            if created:
+                self.id = None
+            self.errors['email'] = "Email Must Be Unique"
         except PendingRollbackError:
             session.rollback()
-            # Handle the error or retry the operation
-        except Exception as e:
+            logger.exception("Contact.save failed: an earlier error left the transaction unusable")
+        except Exception:
             session.rollback()
-            # Handle other exceptions
+            logger.exception("Contact.save failed")
         finally:
             session.close()  # Close the session
 
@@ -110,96 +815,402 @@ class Contact:
         if self.id is not None:
             try:
                 query = contacts_table.delete().where(contacts_table.c.id == self.id)
-                execute_with_retry(query)
+                result = execute_with_retry(query)
                 session.commit()
+                data_changed(delta=-result.rowcount, action="delete", count=result.rowcount, ids=[self.id])
             except PendingRollbackError:
                 session.rollback()
-                # Handle the error or retry the operation
-            except Exception as e:
+                logger.exception("Contact.delete failed: an earlier error left the transaction unusable")
+            except Exception:
                 session.rollback()
-                # Handle other exceptions
+                logger.exception("Contact.delete failed")
             finally:
                 session.close()  # Close the session
 
+    @classmethod
+    def bulk_insert(cls, contacts: Iterable["Contact"], batch_size: int = INSERT_BATCH_SIZE,
+                    on_batch: Callable[[int], None] | None = None) -> int:
+        statement = insert_statement()
+        inserted = 0
+        seen = 0
+        # The existence checks below decide what gets written, so they must not read a lagging replica
+        pin_primary()
+        try:
+            for batch in batched(contacts, batch_size):
+                seen += len(batch)
+                rows = {c.email: {"first": c.first, "last": c.last, "phone": c.phone, "email": c.email,
+                                  **lookup_values(phone=c.phone, email=c.email)}
+                        for c in batch if c.email}
+                # One uniqueness query per batch instead of one per contact; ON CONFLICT covers concurrent writers
+                query = select(contacts_table.c.email).where(contacts_table.c.email.in_(list(rows)))
+                for email in execute_with_retry(query).scalars():
+                    del rows[email]
+                # A concurrent writer can still take an email between the check and the insert, and ON CONFLICT
+                # then skips the row, so count what the database actually inserted
+                added = insert_rows(statement=statement, rows=list(rows.values())) if rows else 0
+                session.commit()
+                inserted += added
+                data_changed(delta=added, action="create", count=added)
+                email_index.add(emails=rows)
+                if on_batch:
+                    on_batch(seen)
+            return inserted
+        except Exception:
+            # Earlier batches stay committed; the caller (a /mock job, say) has to see that this one failed
+            session.rollback()
+            raise
+        finally:
+            session.close()  # Close the session
+
+    @classmethod
+    def upsert_many(cls, rows: list[dict[str, str | None]]) -> tuple[int, int] | None:
+        # Later rows win when the same email appears twice in one batch
+        rows_by_email = {row["email"]: with_lookups(row) for row in rows}
+        pin_primary()
+        try:
+            query = select(contacts_table.c.email).where(contacts_table.c.email.in_(list(rows_by_email)))
+            existing = set(execute_with_retry(query).scalars())
+            statement = insert_statement(upsert=True)
+            if get_engine().dialect.name not in UPSERT_DIALECTS:
+                # No ON CONFLICT support: split the batch into plain inserts and updates
+                updates = [{**row, "_email": email} for email, row in rows_by_email.items() if email in existing]
+                if updates:
+                    session.execute(contacts_table.update().where(contacts_table.c.email == bindparam("_email"))
+                                    .values(first=bindparam("first"), last=bindparam("last"),
+                                            phone=bindparam("phone"), phone_digits=bindparam("phone_digits")),
+                                    updates)
+                rows_by_email = {email: row for email, row in rows_by_email.items() if email not in existing}
+            if rows_by_email:
+                session.execute(statement, list(rows_by_email.values()))
+            session.commit()
+            created = len(set(rows_by_email) - existing)
+            data_changed(delta=created, action="import", count=created + len(existing))
+            email_index.add(emails=rows_by_email)
+            return created, len(existing)
+        except PendingRollbackError:
+            session.rollback()
+            logger.exception("Contact.upsert_many failed: an earlier error left the transaction unusable")
+        except Exception:
+            session.rollback()
+            logger.exception("Contact.upsert_many failed")
+        finally:
+            session.close()  # Close the session
+
+        return None
+
+    @classmethod
+    def import_rows(cls, records: Iterable[tuple[int, dict[str, str] | None, str | None]],
+                    batch_size: int = INSERT_BATCH_SIZE) -> dict:
+        report: dict = {"rows": 0, "created": 0, "updated": 0, "failed": 0, "errors": []}
+        # upsert_many pins each batch's existence check too, since it closes the session in between
+        pin_primary()
+
+        def fail(number: int, errors: dict[str, str]) -> None:
+            report["failed"] += 1
+            if len(report["errors"]) < IMPORT_MAX_ERRORS:
+                report["errors"].append({"row": number, "errors": errors})
+
+        def flush(batch: list[tuple[int, dict[str, str | None]]]) -> None:
+            result = cls.upsert_many(rows=[row for _, row in batch])
+            if result is None:
+                for number, _ in batch:
+                    fail(number, {"row": "Could not be saved"})
+                return
+            report["created"] += result[0]
+            report["updated"] += result[1]
+
+        batch: list[tuple[int, dict[str, str | None]]] = []
+        for number, record, error in records:
+            report["rows"] += 1
+            if record is None:
+                fail(number, {"row": error or "Unreadable row"})
+                continue
+            # Normalizing email and phone later assumes strings, so other JSON types fail this row only
+            invalid = {name: "Must be a string" for name in IMPORT_FIELDS
+                       if record.get(name) is not None and not isinstance(record[name], str)}
+            if invalid:
+                fail(number, invalid)
+                continue
+            values = {name: value.strip() for name, value in record.items() if isinstance(value, str)}
+            row = {
+                "first": values.get("first") or values.get("first_name"),
+                "last": values.get("last") or values.get("last_name"),
+                "phone": values.get("phone"),
+                "email": values.get("email"),
+            }
+            if not row["email"]:
+                fail(number, {"email": "Email Required"})
+                continue
+            batch.append((number, row))
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+        return report
+
+    @classmethod
+    def batch(cls, operations: list) -> list[dict]:
+        # Gets see the state before the batch; deletes, updates and creates then run set-based in one transaction.
+        # Updates merge into the rows read here, so every read goes to the primary
+        pin_primary()
+        results: list[dict] = [{} for _ in operations]
+        gets: list[tuple[int, int]] = []
+        creates: list[tuple[int, dict]] = []
+        updates: list[tuple[int, int, dict]] = []
+        deletes: list[tuple[int, int]] = []
+        written_ids: set[int] = set()
+        for index, operation in enumerate(operations):
+            op = operation.get("op") if isinstance(operation, dict) else None
+            if op not in ("get", "create", "update", "delete"):
+                results[index] = {"op": op, "status": 400, "error": "Unknown operation"}
+                continue
+            fields = operation.get("contact") or {}
+            if not isinstance(fields, dict):
+                results[index] = {"op": op, "status": 400, "error": "contact must be an object"}
+                continue
+            # Normalizing email and phone later assumes strings, so other JSON types fail this item only
+            invalid = {name: "Must be a string" for name in CONTACT_FIELDS
+                       if fields.get(name) is not None and not isinstance(fields[name], str)}
+            if invalid:
+                results[index] = {"op": op, "id": operation.get("id"), "status": 400, "errors": invalid}
+                continue
+            if op == "create":
+                creates.append((index, fields))
+                continue
+            try:
+                contact_id = int(operation.get("id"))
+            except (TypeError, ValueError):
+                results[index] = {"op": op, "status": 400, "error": "id must be an integer"}
+                continue
+            if op == "get":
+                gets.append((index, contact_id))
+            elif contact_id in written_ids:
+                results[index] = {"op": op, "id": contact_id, "status": 409,
+                                  "error": "Contact already changed in this batch"}
+            else:
+                written_ids.add(contact_id)
+                if op == "update":
+                    updates.append((index, contact_id, fields))
+                else:
+                    deletes.append((index, contact_id))
+
+        try:
+            rows: dict[int, dict] = {}
+            ids = sorted({contact_id for _, contact_id in gets} | written_ids)
+            for chunk in batched(ids, DELETE_BATCH_SIZE):
+                for row in execute_with_retry(select(*contact_columns).where(contacts_table.c.id.in_(chunk))):
+                    rows[row.id] = dict(row._mapping)
+            for index, contact_id in gets:
+                results[index] = ({"op": "get", "id": contact_id, "status": 200, "contact": rows[contact_id]}
+                                  if contact_id in rows else
+                                  {"op": "get", "id": contact_id, "status": 404, "error": "Contact not found"})
+
+            delete_ids = sorted({contact_id for _, contact_id in deletes if contact_id in rows})
+            pending_updates: list[tuple[int, dict]] = []
+            for index, contact_id, fields in updates:
+                if contact_id not in rows:
+                    results[index] = {"op": "update", "id": contact_id, "status": 404, "error": "Contact not found"}
+                    continue
+                pending_updates.append((index, {**rows[contact_id],
+                                                **{name: fields[name] for name in CONTACT_FIELDS if name in fields}}))
+            pending_creates = [(index, {name: fields.get(name) for name in CONTACT_FIELDS}) for index, fields in creates]
+
+            # One query finds every current owner of the emails being written
+            owners: dict[str, int] = {}
+            emails = {row["email"] for _, row in pending_updates + pending_creates if row["email"]}
+            for chunk in batched(sorted(emails), DELETE_BATCH_SIZE):
+                query = select(contacts_table.c.id, contacts_table.c.email).where(contacts_table.c.email.in_(chunk))
+                for row in execute_with_retry(query):
+                    owners[row.email] = row.id
+            rows_deleted = set(delete_ids)
+            claimed: set[str] = set()
+            update_rows: list[tuple[int, dict]] = []
+            create_rows: list[tuple[int, dict]] = []
+            for (index, row), op, accepted in ([(item, "update", update_rows) for item in pending_updates] +
+                                               [(item, "create", create_rows) for item in pending_creates]):
+                owner = owners.get(row["email"])
+                if not row["email"]:
+                    results[index] = {"op": op, "id": row.get("id"), "status": 400,
+                                      "errors": {"email": "Email Required"}}
+                elif row["email"] in claimed or (owner is not None and owner != row.get("id")
+                                                 and owner not in rows_deleted):
+                    results[index] = {"op": op, "id": row.get("id"), "status": 409,
+                                      "errors": {"email": "Email Must Be Unique"}}
+                else:
+                    claimed.add(row["email"])
+                    accepted.append((index, row))
+
+            deleted = 0
+            for chunk in batched(delete_ids, DELETE_BATCH_SIZE):
+                deleted += execute_with_retry(contacts_table.delete().where(contacts_table.c.id.in_(chunk))).rowcount
+            if update_rows:
+                session.execute(contacts_table.update().where(contacts_table.c.id == bindparam("_id")),
+                                [{"_id": row["id"], **with_lookups({name: row[name] for name in CONTACT_FIELDS})}
+                                 for _, row in update_rows])
+            if create_rows:
+                values = [with_lookups(row) for _, row in create_rows]
+                if get_engine().dialect.insert_executemany_returning_sort_by_parameter_order:
+                    query = contacts_table.insert().returning(contacts_table.c.id, sort_by_parameter_order=True)
+                    new_ids = list(session.execute(query, values).scalars())
+                else:
+                    new_ids = [execute_with_retry(contacts_table.insert().values(**row)).inserted_primary_key[0]
+                               for row in values]
+                for (_, row), new_id in zip(create_rows, new_ids):
+                    row["id"] = new_id
+            session.commit()
+            data_changed(delta=len(create_rows) - deleted, action="batch",
+                         count=len(create_rows) + len(update_rows) + deleted)
+            email_index.add(emails=claimed)
+
+            for index, contact_id in deletes:
+                results[index] = ({"op": "delete", "id": contact_id, "status": 200} if contact_id in rows else
+                                  {"op": "delete", "id": contact_id, "status": 404, "error": "Contact not found"})
+            for index, row in update_rows:
+                results[index] = {"op": "update", "id": row["id"], "status": 200, "contact": row}
+            for index, row in create_rows:
+                results[index] = {"op": "create", "id": row["id"], "status": 201, "contact": row}
+            return results
+        except PendingRollbackError:
+            session.rollback()
+            logger.exception("Contact.batch failed: an earlier error left the transaction unusable")
+        except Exception:
+            session.rollback()
+            logger.exception("Contact.batch failed")
+        finally:
+            session.close()  # Close the session
+
+        # Nothing was written: every operation that was still pending reports the failure
+        return [result or {"op": operation.get("op"), "status": 500, "error": "Batch failed, no changes were saved"}
+                for result, operation in zip(results, operations)]
+
+    @classmethod
+    def delete_many(cls, ids: list[int]) -> int:
+        ids = list(dict.fromkeys(ids))
+        try:
+            # One transaction, one DELETE ... IN (...) per batch to stay under bind parameter limits
+            deleted = 0
+            for start in range(0, len(ids), DELETE_BATCH_SIZE):
+                query = contacts_table.delete().where(contacts_table.c.id.in_(ids[start:start + DELETE_BATCH_SIZE]))
+                deleted += execute_with_retry(query).rowcount
+            session.commit()
+            data_changed(delta=-deleted, action="delete", count=deleted)
+            return deleted
+        except PendingRollbackError:
+            session.rollback()
+            logger.exception("Contact.delete_many failed: an earlier error left the transaction unusable")
+        except Exception:
+            session.rollback()
+            logger.exception("Contact.delete_many failed")
+        finally:
+            session.close()  # Close the session
+
+        return 0
+
     @classmethod
     def count(cls) -> int:
-        time.sleep(2)
         try:
-            query = session.query(contacts_table).count()
-            count = execute_with_retry(query).scalar()
-            return count
+            return contact_counter.get()
         except PendingRollbackError:
             session.rollback()
-            # Handle the error or retry the operation
-        except Exception as e:
+            logger.exception("Contact.count failed: an earlier error left the transaction unusable")
+        except Exception:
             session.rollback()
-            # Handle other exceptions
+            logger.exception("Contact.count failed")
         finally:
             session.close()  # Close the session
 
         return 0
 
     @classmethod
-    def all(cls, page=None):
+    def all(cls, after: str | None = None, size: int | str | None = None) -> list[ContactRecord]:
+        key = cache.key("all", decode_cursor(after), page_size(size))
+        cached = cache.get(key) if result_cache_readable() else None
+        if cached is not None:
+            return cached
         try:
-            if page is None:
-                query = session.query(contacts_table)
-            else:
-                page = int(page)
-                start = (page) * PAGE_SIZE
-                query = session.query(contacts_table).limit(PAGE_SIZE).offset(start)
-            rows = execute_with_retry(query).all()
-            return [Contact(
-                id_=row.id,
-                first=row.first,
-                last=row.last,
-                phone=row.phone,
-                email=row.email
-            ) for row in rows]
+            # Keyset pagination: seek past the last seen id instead of OFFSET, so every page costs the same
+            query = select(*contact_columns).order_by(contacts_table.c.id).limit(page_size(size))
+            last_id = decode_cursor(after)
+            if last_id is not None:
+                query = query.where(contacts_table.c.id > last_id)
+            contacts = to_records(execute_with_retry(query))
+            if result_cache_writable():
+                cache.set(key, contacts)
+            return contacts
         except PendingRollbackError:
             session.rollback()
-            # Handle the error or retry the operation
-        except Exception as e:
+            logger.exception("Contact.all failed: an earlier error left the transaction unusable")
+        except Exception:
             session.rollback()
-            # Handle other exceptions
+            logger.exception("Contact.all failed")
         finally:
             session.close()  # Close the session
 
         return []
 
     @classmethod
-    def search(cls, text):
-        like_text = f'%{text}%'
+    def search(cls, text: str, after: str | None = None, size: int | str | None = None) -> list[ContactRecord]:
+        key = cache.key("search", text, decode_cursor(after), page_size(size))
+        cached = cache.get(key) if result_cache_readable() else None
+        if cached is not None:
+            return cached
         try:
-            query = session.query(contacts_table).filter(
-                contacts_table.c.first.like(like_text) |
-                contacts_table.c.last.like(like_text) |
-                contacts_table.c.phone.like(like_text) |
-                contacts_table.c.email.like(like_text)
-            )
-            rows = execute_with_retry(query).all()
-            return [Contact(
-                id_=row.id,
-                first=row.first,
-                last=row.last,
-                phone=row.phone,
-                email=row.email
-            ) for row in rows]
+            # Ranked results page by offset; the cursor keeps that opaque to callers
+            query = search_index.query(text_=text, limit=page_size(size), offset=decode_cursor(after) or 0)
+            contacts = to_records(execute_with_retry(query))
+            if not contacts and search_index.lookup(text_=text) is not None:
+                # Nothing starts with it (part of a number, say): fall back to matching anywhere
+                query = search_index.query(text_=text, limit=page_size(size), offset=decode_cursor(after) or 0,
+                                           lookup=False)
+                contacts = to_records(execute_with_retry(query))
+            if result_cache_writable():
+                cache.set(key, contacts)
+            return contacts
         except PendingRollbackError:
             session.rollback()
-            # Handle the error or retry the operation
-        except Exception as e:
+            logger.exception("Contact.search failed: an earlier error left the transaction unusable")
+        except Exception:
             session.rollback()
-            # Handle other exceptions
+            logger.exception("Contact.search failed")
         finally:
             session.close()  # Close the session
 
         return []
 
+    @classmethod
+    def stream_records(cls, since_id: int | None = None, since_time: datetime | None = None,
+                       chunk_size: int = ARCHIVE_CHUNK_SIZE) -> Iterator[list[dict]]:
+        query = select(*contact_columns, contacts_table.c.updated_at)
+        if since_time is not None:
+            if since_time.tzinfo is not None:
+                since_time = since_time.astimezone(timezone.utc)
+            query = query.where(contacts_table.c.updated_at > since_time).order_by(contacts_table.c.updated_at,
+                                                                                  contacts_table.c.id)
+        else:
+            if since_id is not None:
+                query = query.where(contacts_table.c.id > since_id)
+            query = query.order_by(contacts_table.c.id)
+
+        # Server-side cursor on a dedicated connection: one chunk of rows in memory at a time
+        with get_read_engine().connect() as connection:
+            result = connection.execution_options(yield_per=chunk_size).execute(query)
+            for rows in result.partitions():
+                records = []
+                for row in rows:
+                    record = dict(row._mapping)
+                    updated_at = record["updated_at"]
+                    if updated_at is not None:
+                        if updated_at.tzinfo is None:
+                            updated_at = updated_at.replace(tzinfo=timezone.utc)
+                        record["updated_at"] = updated_at.isoformat()
+                    records.append(record)
+                yield records
+
     @classmethod
     def find(cls, id_):
         try:
-            query = session.query(contacts_table).filter(contacts_table.c.id == id_)
+            query = select(*contact_columns).where(contacts_table.c.id == id_)
             row = execute_with_retry(query).first()
             if row:
                 return Contact(
@@ -211,10 +1222,10 @@ class Contact:
                 )
         except PendingRollbackError:
             session.rollback()
-            # Handle the error or retry the operation
-        except Exception as e:
+            logger.exception("Contact.find failed: an earlier error left the transaction unusable")
+        except Exception:
             session.rollback()
-            # Handle other exceptions
+            logger.exception("Contact.find failed")
         finally:
             session.close()  # Close the session
 
@@ -222,61 +1233,80 @@ class Contact:
 
 
 class Archiver:
-    archive_status: str = "Waiting"
-    archive_progress: float = 0
-    thread = None
+    def __init__(self, job: Job | None = None) -> None:
+        self.job: Job | None = job
 
     def status(self) -> str:
-        return Archiver.archive_status
+        return self.job.status if self.job else "Waiting"
 
     def progress(self) -> float:
-        return Archiver.archive_progress
+        return self.job.progress() if self.job else 0
 
     def run(self) -> None:
-        if Archiver.archive_status == "Waiting":
-            Archiver.archive_status = "Running"
-            Archiver.archive_progress = 0
-            Archiver.thread = Thread(target=self.run_impl)
-            Archiver.thread.start()
-
-    def run_impl(self) -> None:
-        for i in range(10):
-            time.sleep(1 * random())
-            if Archiver.archive_status != "Running":
-                return
-            Archiver.archive_progress = (i + 1) / 10
-            print("Here... " + str(object=Archiver.archive_progress))
-        time.sleep(1)
-        if Archiver.archive_status != "Running":
-            return
-        Archiver.archive_status = "Complete"
+        if self.status() == "Waiting":
+            self.job = job_runner.submit(kind="archive", target=self.run_impl)
 
-    def archive_file(self) -> str:
-        try:
-            contacts = session.query(contacts_table).all()
-            csv_content = "id,first,last,phone,email\n"
-            for contact in contacts:
-                csv_content += f"{contact.id},{contact.first},{contact.last},{contact.phone},{contact.email}\n"
+    def run_impl(self, job: Job) -> None:
+        with get_read_engine().connect() as connection:
+            total = connection.execute(select(func.count()).select_from(contacts_table)).scalar() or 0
+        path = os.path.join(JOB_DIR, f"{job.id}.csv")
+        job_store.update(job.id, total=total)
 
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as temp_file:
-                temp_file.write(csv_content.encode('utf-8'))
-                temp_file_path: str = temp_file.name
+        written = 0
 
-            return temp_file_path
-        except PendingRollbackError:
-            session.rollback()
-            # Handle the error or retry the operation
-        except Exception as e:
-            session.rollback()
-            # Handle other exceptions
-        finally:
-            session.close()  # Close the session
+        def on_rows(count: int) -> None:
+            nonlocal written
+            written += count
+            job_store.update(job.id, done=written)
+
+        with open(path + ".part", "w", encoding="utf-8", newline="") as archive:
+            for chunk in self.archive_chunks(on_rows=on_rows):
+                archive.write(chunk)
+                # The job record disappears when the user clears the download mid-run
+                if job_store.get(job.id) is None:
+                    break
+        # The worker cleans up after itself: JobStore.delete leaves a running job's files alone
+        if job_store.get(job.id) is None:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path + ".part")
+            return
+        os.replace(path + ".part", path)
+        job_store.update(job.id, path=path)
+        # Cleared before the path was recorded, so the delete didn't know about the finished file
+        if job_store.get(job.id) is None:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
 
-        return ""
+    def archive_chunks(self, chunk_size: int = ARCHIVE_CHUNK_SIZE,
+                       on_rows: Callable[[int], None] | None = None) -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(ARCHIVE_COLUMNS)
+        yield buffer.getvalue()
+
+        # Own connection with a server-side cursor: rows arrive chunk_size at a time and are written out
+        # before the next batch is fetched, so memory stays flat and the header goes out immediately
+        with get_read_engine().connect() as connection:
+            query = select(*[contacts_table.c[name] for name in ARCHIVE_COLUMNS]).order_by(contacts_table.c.id)
+            result = connection.execution_options(yield_per=chunk_size).execute(query)
+            for rows in result.partitions():
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(rows)
+                if on_rows:
+                    on_rows(len(rows))
+                yield buffer.getvalue()
+
+    def archive_file(self) -> str | None:
+        if self.job and self.job.status == "Complete" and self.job.path and os.path.exists(self.job.path):
+            return self.job.path
+        return None
 
     def reset(self) -> None:
-        Archiver.archive_status = "Waiting"
+        if self.job:
+            job_store.delete(self.job.id)
+            self.job = None
 
     @classmethod
-    def get(cls) -> "Archiver":
-        return Archiver()
\ No newline at end of file
+    def get(cls, job_id: str | None = None) -> "Archiver":
+        return Archiver(job=job_store.get(job_id))
@@ -0,0 +1,108 @@
+import logging
+import os
+from threading import Lock
+
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from cache import cache
+from contacts import (ContactRecord, contact_columns, contact_counter, contacts_table, db_url, decode_cursor,
+                      engine_options, page_size, to_records)
+
+# Async Contact Model
+# ========================================================
+# Read side of the model on an asyncio engine, for the ASGI entry point (asgi.py). Queries, cache keys
+# and the cached count are shared with the synchronous model, so both serving modes see the same data.
+# These reads always go to the primary: READ_CONNECTION_STRINGS only routes the synchronous session, so
+# under replicas the native ASGI routes put their load on the primary (and never read stale rows).
+
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+logger = logging.getLogger("contact_app.contacts_async")
+
+
+def async_url(url: str) -> str:
+    override = os.environ.get("ASYNC_CONNECTION_STRING")
+    if override:
+        return override
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name(), parsed.drivername)
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+_async_engine: AsyncEngine | None = None
+_async_engine_lock: Lock = Lock()
+
+
+def get_async_engine() -> AsyncEngine:
+    # Created on first use, like get_engine(), so importing asgi.py opens nothing
+    global _async_engine
+    if _async_engine is None:
+        with _async_engine_lock:
+            if _async_engine is None:
+                url = async_url(db_url)
+                _async_engine = create_async_engine(url, **engine_options(url))
+    return _async_engine
+
+
+async def dispose_async_engine() -> None:
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
+
+session_factory = async_sessionmaker(expire_on_commit=False)
+
+
+def async_session() -> AsyncSession:
+    return session_factory(bind=get_async_engine())
+
+
+class AsyncContact:
+    @classmethod
+    async def count(cls) -> int:
+        value = contact_counter.peek()
+        if value is not None:
+            return value
+        try:
+            async with async_session() as session:
+                for query in contact_counter.queries():
+                    value = (await session.execute(query)).scalar()
+                    if value is not None and value >= 0:
+                        return contact_counter.store(value=int(value))
+        except Exception:
+            logger.exception("AsyncContact.count failed")
+
+        return 0
+
+    @classmethod
+    async def all(cls, after: str | None = None, size: int | str | None = None) -> list[ContactRecord]:
+        key = cache.key("all", decode_cursor(after), page_size(size))
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        try:
+            query = select(*contact_columns).order_by(contacts_table.c.id).limit(page_size(size))
+            last_id = decode_cursor(after)
+            if last_id is not None:
+                query = query.where(contacts_table.c.id > last_id)
+            async with async_session() as session:
+                contacts = to_records((await session.execute(query)).all())
+            cache.set(key, contacts)
+            return contacts
+        except Exception:
+            logger.exception("AsyncContact.all failed")
+
+        return []
+
+    @classmethod
+    async def find(cls, id_: int) -> ContactRecord | None:
+        try:
+            query = select(*contact_columns).where(contacts_table.c.id == id_)
+            async with async_session() as session:
+                contacts = to_records((await session.execute(query)).all())
+            return contacts[0] if contacts else None
+        except Exception:
+            logger.exception("AsyncContact.find failed")
+
+        return None
@@ -0,0 +1,384 @@
+import logging
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timezone
+from difflib import SequenceMatcher
+from itertools import batched, combinations
+from multiprocessing import get_context
+from typing import Iterable, Iterator, NamedTuple
+
+from sqlalchemy import (Column, DateTime, Float, Index, Integer, String, Table, UniqueConstraint, and_,
+                        select)
+from sqlalchemy.exc import PendingRollbackError
+
+from contacts import (CONTACT_FIELDS, ContactRecord, contact_columns, contacts_table, data_changed, decode_cursor,
+                      execute_with_retry, get_engine, lookup_values, metadata, page_size, pin_primary, session)
+from jobs import Job, job_store
+from normalize import email_local, email_lower, normalize_name, phone_digits
+
+# Duplicate Detection
+# ========================================================
+# Contacts are grouped into blocks that share a blocking key (normalized last name + first initial, or phone
+# digits), and only contacts inside a block are compared, so the work grows with block sizes rather than with
+# n². The keys live in contact_blocks, indexed by key, so an incremental run can pull every block a changed
+# contact belongs to. Blocks are scored in a process pool and pairs above DEDUP_THRESHOLD are stored in
+# merge_candidates for review.
+
+DEDUP_THRESHOLD = float(os.environ.get("DEDUP_THRESHOLD", 0.8))
+DEDUP_WORKERS = int(os.environ.get("DEDUP_WORKERS", os.cpu_count() or 1))
+# Blocks larger than this are compared with a sliding window over their sorted members instead of pairwise
+DEDUP_MAX_BLOCK = int(os.environ.get("DEDUP_MAX_BLOCK", 50))
+DEDUP_WINDOW = int(os.environ.get("DEDUP_WINDOW", 20))
+DEDUP_BATCH_BLOCKS = int(os.environ.get("DEDUP_BATCH_BLOCKS", 2000))
+DEDUP_PAGE_SIZE = 10000
+
+logger = logging.getLogger("contact_app.dedup")
+
+blocks_table = Table('contact_blocks', metadata,
+                     Column('key', String, primary_key=True),
+                     Column('contact_id', Integer, primary_key=True),
+                     Index('contact_blocks_contact_id', 'contact_id')
+                     )
+
+candidates_table = Table('merge_candidates', metadata,
+                         Column('id', Integer, primary_key=True, autoincrement=True),
+                         # No foreign keys: reviewed pairs outlive the contact a merge deletes
+                         Column('contact_id', Integer, nullable=False),
+                         Column('duplicate_id', Integer, nullable=False),
+                         Column('score', Float, nullable=False),
+                         Column('reasons', String),
+                         Column('status', String, nullable=False, default="pending"),
+                         Column('created_at', DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)),
+                         UniqueConstraint('contact_id', 'duplicate_id'),
+                         Index('merge_candidates_status', 'status')
+                         )
+
+runs_table = Table('dedup_runs', metadata,
+                   Column('id', Integer, primary_key=True, autoincrement=True),
+                   Column('mode', String, nullable=False),
+                   Column('started_at', DateTime(timezone=True), nullable=False),
+                   Column('finished_at', DateTime(timezone=True)),
+                   Column('contacts', Integer, default=0),
+                   Column('candidates', Integer, default=0)
+                   )
+
+DEDUP_TABLES = [blocks_table, candidates_table, runs_table]
+
+
+def blocking_keys(record: ContactRecord) -> list[str]:
+    keys: list[str] = []
+    last = normalize_name(record.last)
+    if last:
+        keys.append(f"n:{last}:{normalize_name(record.first)[:1]}")
+    digits = phone_digits(record.phone)
+    if len(digits) >= 7:
+        keys.append(f"p:{digits}")
+    return keys
+
+
+class Normalized(NamedTuple):
+    id: int
+    first: str
+    last: str
+    phone: str
+    email: str
+    local: str
+
+
+def normalize(record: ContactRecord) -> Normalized:
+    return Normalized(id=record.id, first=normalize_name(record.first), last=normalize_name(record.last),
+                      phone=phone_digits(record.phone), email=email_lower(record.email),
+                      local=email_local(record.email))
+
+
+WEIGHTS = {"first": 0.3, "last": 0.2, "phone": 0.3, "email": 0.2}
+
+
+def similarity_bound(a: str, b: str) -> float:
+    # Cheap upper bound on similarity(): the ratio can't beat what the lengths allow
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    return 2 * min(len(a), len(b)) / (len(a) + len(b))
+
+
+def similarity(a: str, b: str) -> float:
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def score(a: Normalized, b: Normalized, threshold: float = 0) -> tuple[float, list[str]]:
+    phone = 0.5 if not a.phone or not b.phone else float(a.phone == b.phone)
+    email_match = bool(a.email) and a.email == b.email
+    bound = (WEIGHTS["first"] * similarity_bound(a.first, b.first) + WEIGHTS["last"] * similarity_bound(a.last, b.last)
+             + WEIGHTS["phone"] * phone + WEIGHTS["email"] * (1.0 if email_match else similarity_bound(a.local, b.local)))
+    # Most pairs in a block are different people; skip the string matching when they can't reach the threshold
+    if bound < threshold:
+        return 0.0, []
+    values = {"first": similarity(a.first, b.first), "last": similarity(a.last, b.last), "phone": phone,
+              "email": 1.0 if email_match else similarity(a.local, b.local)}
+    reasons = [name for name, value in values.items() if value >= 0.9]
+    return sum(WEIGHTS[name] * value for name, value in values.items()), reasons
+
+
+def block_pairs(members: list[Normalized]) -> Iterator[tuple[Normalized, Normalized]]:
+    if len(members) <= DEDUP_MAX_BLOCK:
+        yield from combinations(members, 2)
+        return
+    # Sorted neighbourhood: likely duplicates sort next to each other, so compare each record with the next few
+    ordered = sorted(members, key=lambda record: (record.first, record.local))
+    for index, record in enumerate(ordered):
+        for other in ordered[index + 1:index + DEDUP_WINDOW]:
+            yield record, other
+
+
+def score_blocks(blocks: list[tuple[list[ContactRecord], frozenset[int] | None]],
+                 threshold: float) -> list[tuple[int, int, float, str]]:
+    # Runs in the process pool; `focus` limits an incremental run to pairs involving changed contacts
+    found: list[tuple[int, int, float, str]] = []
+    for members, focus in blocks:
+        for a, b in block_pairs([normalize(record) for record in members]):
+            if focus is not None and a.id not in focus and b.id not in focus:
+                continue
+            value, reasons = score(a, b, threshold=threshold)
+            if value >= threshold:
+                low, high = sorted((a.id, b.id))
+                found.append((low, high, round(value, 3), ",".join(reasons)))
+    return found
+
+
+class Deduplicator:
+    def __init__(self, job: Job | None = None, workers: int = DEDUP_WORKERS,
+                 threshold: float = DEDUP_THRESHOLD) -> None:
+        self.job: Job | None = job
+        self.workers: int = workers
+        self.threshold: float = threshold
+        self.scanned: int = 0
+
+    def progress(self, done: int | None = None, total: int | None = None) -> None:
+        if self.job:
+            fields = {name: value for name, value in (("done", done), ("total", total)) if value is not None}
+            job_store.update(self.job.id, **fields)
+
+    def watermark(self) -> datetime | None:
+        with get_engine().connect() as connection:
+            return connection.execute(select(runs_table.c.started_at).where(runs_table.c.finished_at.is_not(None))
+                                      .order_by(runs_table.c.started_at.desc()).limit(1)).scalar()
+
+    def run(self, incremental: bool = False) -> dict:
+        metadata.create_all(get_engine(), tables=DEDUP_TABLES)
+        started_at = datetime.now(timezone.utc)
+        since = self.watermark() if incremental else None
+        mode = "incremental" if since is not None else "full"
+
+        with get_engine().begin() as connection:
+            run_id = connection.execute(runs_table.insert().values(mode=mode, started_at=started_at)
+                                        ).inserted_primary_key[0]
+        changed, keys = self.index(since=since)
+
+        if since is not None and not changed:
+            candidates: set[tuple[int, int, float, str]] = set()
+        else:
+            candidates = self.find(keys=keys if since is not None else None,
+                                   focus=frozenset(changed) if since is not None else None)
+
+        created = self.store(candidates=candidates)
+        with get_engine().begin() as connection:
+            connection.execute(runs_table.update().where(runs_table.c.id == run_id).values(
+                finished_at=datetime.now(timezone.utc), contacts=len(changed), candidates=created))
+        return {"mode": mode, "contacts": len(changed), "scanned": self.scanned, "candidates": created}
+
+    def index(self, since: datetime | None) -> tuple[list[int], set[str]]:
+        # Recompute blocking keys for every contact (full run) or for contacts changed since the last run. Each
+        # page commits on its own, so on SQLite other writers wait for one page rather than the whole rebuild
+        query = select(*contact_columns).order_by(contacts_table.c.id).limit(DEDUP_PAGE_SIZE)
+        if since is None:
+            with get_engine().begin() as connection:
+                connection.execute(blocks_table.delete())
+        else:
+            if since.tzinfo is not None:
+                since = since.astimezone(timezone.utc)
+            query = query.where(contacts_table.c.updated_at > since)
+
+        changed: list[int] = []
+        keys: set[str] = set()
+        memberships = 0
+        last_id = 0
+        while True:
+            with get_engine().begin() as connection:
+                records = [ContactRecord._make(row)
+                           for row in connection.execute(query.where(contacts_table.c.id > last_id))]
+                if not records:
+                    break
+                ids = [record.id for record in records]
+                if since is not None:
+                    connection.execute(blocks_table.delete().where(blocks_table.c.contact_id.in_(ids)))
+                rows = [{"key": key, "contact_id": record.id} for record in records for key in blocking_keys(record)]
+                if rows:
+                    connection.execute(blocks_table.insert(), rows)
+            last_id = records[-1].id
+            changed.extend(ids)
+            keys.update(row["key"] for row in rows)
+            memberships += len(rows)
+        # Progress counts block rows read back for scoring; exact for a full run, a lower bound otherwise
+        self.progress(done=0, total=memberships)
+        return changed, keys
+
+    def blocks(self, keys: set[str] | None) -> Iterator[list[ContactRecord]]:
+        # Rows arrive in key order straight off the blocking index, so a block is a run of equal keys
+        query = (select(blocks_table.c.key, *contact_columns)
+                 .join(contacts_table, contacts_table.c.id == blocks_table.c.contact_id)
+                 .order_by(blocks_table.c.key))
+        key_batches: Iterable = [None] if keys is None else batched(sorted(keys), 500)
+        with get_engine().connect() as connection:
+            for key_batch in key_batches:
+                batch_query = query if key_batch is None else query.where(blocks_table.c.key.in_(key_batch))
+                current_key: str | None = None
+                members: list[ContactRecord] = []
+                for row in connection.execution_options(yield_per=DEDUP_PAGE_SIZE).execute(batch_query):
+                    self.scanned += 1
+                    if row.key != current_key:
+                        if len(members) > 1:
+                            yield members
+                        current_key, members = row.key, []
+                    members.append(ContactRecord._make(row[1:]))
+                if len(members) > 1:
+                    yield members
+
+    def find(self, keys: set[str] | None, focus: frozenset[int] | None) -> set[tuple[int, int, float, str]]:
+        candidates: dict[tuple[int, int], tuple[int, int, float, str]] = {}
+        pending: list[Future] = []
+
+        def collect(future: Future) -> None:
+            for candidate in future.result():
+                candidates.setdefault(candidate[:2], candidate)
+
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn")) as executor:
+            for batch in batched(self.blocks(keys=keys), DEDUP_BATCH_BLOCKS):
+                work = [(members, focus) for members in batch]
+                pending.append(executor.submit(score_blocks, work, self.threshold))
+                # Bound the blocks held in memory while workers catch up
+                while len(pending) > self.workers * 2:
+                    collect(pending.pop(0))
+                self.progress(done=self.scanned)
+            for future in pending:
+                collect(future)
+        return set(candidates.values())
+
+    @staticmethod
+    def store(candidates: set[tuple[int, int, float, str]]) -> int:
+        # Pairs already reviewed (merged or dismissed) or already pending are left as they are; one short
+        # transaction per chunk, like index()
+        created = 0
+        for chunk in batched(sorted(candidates), 500):
+            with get_engine().begin() as connection:
+                existing = {(row.contact_id, row.duplicate_id) for row in connection.execute(
+                    select(candidates_table.c.contact_id, candidates_table.c.duplicate_id).where(
+                        candidates_table.c.contact_id.in_({candidate[0] for candidate in chunk})))}
+                rows = [{"contact_id": low, "duplicate_id": high, "score": value, "reasons": reasons}
+                        for low, high, value, reasons in chunk if (low, high) not in existing]
+                if rows:
+                    connection.execute(candidates_table.insert(), rows)
+                    created += len(rows)
+        return created
+
+
+def run_dedup(job: Job, incremental: bool = False) -> None:
+    _ = Deduplicator(job=job).run(incremental=incremental)
+
+
+def recent_runs(limit: int = 10) -> list[dict]:
+    metadata.create_all(get_engine(), tables=DEDUP_TABLES)
+    with get_engine().connect() as connection:
+        rows = connection.execute(select(runs_table).order_by(runs_table.c.id.desc()).limit(limit))
+        return [dict(row._mapping) for row in rows]
+
+
+def list_candidates(status: str = "pending", after: str | None = None, size: int | str | None = None,
+                    min_score: float = 0) -> list[dict]:
+    contact = contacts_table.alias("contact")
+    duplicate = contacts_table.alias("duplicate")
+    query = (select(candidates_table.c.id, candidates_table.c.score, candidates_table.c.reasons,
+                    candidates_table.c.status,
+                    *[contact.c[column.name].label(f"contact_{column.name}") for column in contact_columns],
+                    *[duplicate.c[column.name].label(f"duplicate_{column.name}") for column in contact_columns])
+             .join(contact, contact.c.id == candidates_table.c.contact_id)
+             .join(duplicate, duplicate.c.id == candidates_table.c.duplicate_id)
+             .where(and_(candidates_table.c.status == status, candidates_table.c.score >= min_score))
+             .order_by(candidates_table.c.id).limit(page_size(size)))
+    last_id = decode_cursor(after)
+    if last_id is not None:
+        query = query.where(candidates_table.c.id > last_id)
+    try:
+        return [{
+            "id": row.id,
+            "score": row.score,
+            "reasons": row.reasons.split(",") if row.reasons else [],
+            "status": row.status,
+            "contact": {column.name: row._mapping[f"contact_{column.name}"] for column in contact_columns},
+            "duplicate": {column.name: row._mapping[f"duplicate_{column.name}"] for column in contact_columns},
+        } for row in execute_with_retry(query)]
+    except PendingRollbackError:
+        session.rollback()
+        logger.exception("list_candidates failed: an earlier error left the transaction unusable")
+    except Exception:
+        session.rollback()
+        logger.exception("list_candidates failed")
+    finally:
+        session.close()  # Close the session
+
+    return []
+
+
+def review_candidate(candidate_id: int, merge: bool, keep_id: int | None = None) -> dict | None:
+    # Merging keeps one contact, fills its blank fields from the other and deletes the other
+    try:
+        # Read-modify-write: a lagging replica could offer a candidate that was already reviewed
+        pin_primary()
+        candidate = execute_with_retry(select(candidates_table).where(candidates_table.c.id == candidate_id)).first()
+        if candidate is None or candidate.status != "pending":
+            return None
+        if not merge:
+            execute_with_retry(candidates_table.update().where(candidates_table.c.id == candidate_id)
+                               .values(status="dismissed"))
+            session.commit()
+            return {"id": candidate_id, "status": "dismissed"}
+
+        keep_id = keep_id if keep_id in (candidate.contact_id, candidate.duplicate_id) else candidate.contact_id
+        drop_id = candidate.duplicate_id if keep_id == candidate.contact_id else candidate.contact_id
+        rows = {row.id: row for row in execute_with_retry(
+            select(*contact_columns).where(contacts_table.c.id.in_([keep_id, drop_id])))}
+        if len(rows) != 2:
+            return None
+        kept, dropped = rows[keep_id], rows[drop_id]
+        values = {name: getattr(dropped, name) for name in CONTACT_FIELDS
+                  if not getattr(kept, name) and getattr(dropped, name)}
+        # Delete first so a taken-over email doesn't collide with the unique constraint
+        execute_with_retry(contacts_table.delete().where(contacts_table.c.id == drop_id))
+        if values:
+            values.update(lookup_values(phone=values.get("phone") or kept.phone,
+                                        email=values.get("email") or kept.email))
+            execute_with_retry(contacts_table.update().where(contacts_table.c.id == keep_id).values(**values))
+        execute_with_retry(candidates_table.update().where(candidates_table.c.id == candidate_id)
+                           .values(status="merged"))
+        # Other pending pairs with the dropped contact are moot; the kept one is re-checked on the next run
+        execute_with_retry(candidates_table.delete().where(and_(
+            candidates_table.c.status == "pending",
+            (candidates_table.c.contact_id == drop_id) | (candidates_table.c.duplicate_id == drop_id))))
+        session.commit()
+        data_changed(delta=-1, action="merge", count=2, ids=[keep_id, drop_id])
+        return {"id": candidate_id, "status": "merged", "kept": keep_id, "deleted": drop_id}
+    except PendingRollbackError:
+        session.rollback()
+        logger.exception("review_candidate failed: an earlier error left the transaction unusable")
+    except Exception:
+        session.rollback()
+        logger.exception("review_candidate failed")
+    finally:
+        session.close()  # Close the session
+
+    return None
@@ -0,0 +1,166 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from queue import Empty, Full, Queue
+from threading import Lock, Thread
+from typing import Iterator
+
+# Live Events
+# ========================================================
+# Publishers append to a small SQLite event log shared by every worker process on the host. Each process
+# runs one poller thread that reads new rows and fans them out to its own subscribers (open /events
+# streams), so a write in one worker reaches browsers connected to any other.
+
+EVENT_DB_PATH = os.environ.get("EVENT_DB_PATH", os.path.join(tempfile.gettempdir(), "contact_app_events.db"))
+EVENT_POLL_INTERVAL = float(os.environ.get("EVENT_POLL_INTERVAL", 0.25))
+EVENT_TTL = float(os.environ.get("EVENT_TTL", 300))
+EVENT_QUEUE_SIZE = int(os.environ.get("EVENT_QUEUE_SIZE", 100))
+EVENT_COLUMNS = ["id", "channel", "name", "data", "created_at"]
+
+logger = logging.getLogger("contact_app.events")
+
+
+class Event:
+    def __init__(self, id_: int, channel: str, name: str, data: str, created_at: float) -> None:
+        self.id: int = id_
+        self.channel: str = channel
+        self.name: str = name
+        self.data: dict = json.loads(data)
+        self.created_at: float = created_at
+
+
+class Subscription:
+    def __init__(self, channels: set[str]) -> None:
+        self.channels: set[str] = channels
+        self.queue: Queue[Event] = Queue(maxsize=EVENT_QUEUE_SIZE)
+        # Broker position when subscribed: every later event on these channels is delivered here
+        self.after: int = 0
+
+    def deliver(self, event: Event) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except Full:
+            # A stalled client misses events rather than growing the queue without bound
+            pass
+
+    def get(self, timeout: float) -> Event | None:
+        try:
+            return self.queue.get(timeout=timeout)
+        except Empty:
+            return None
+
+
+class AsyncSubscription(Subscription):
+    # Delivers into an asyncio queue on the subscriber's event loop, for the ASGI app
+    def __init__(self, channels: set[str], loop: asyncio.AbstractEventLoop) -> None:
+        super().__init__(channels=channels)
+        self.loop: asyncio.AbstractEventLoop = loop
+        self.async_queue: asyncio.Queue[Event] = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+
+    def deliver(self, event: Event) -> None:
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: Event) -> None:
+        if not self.async_queue.full():
+            self.async_queue.put_nowait(event)
+
+    async def get_async(self, timeout: float) -> Event | None:
+        try:
+            return await asyncio.wait_for(self.async_queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBroker:
+    def __init__(self, path: str = EVENT_DB_PATH, poll_interval: float = EVENT_POLL_INTERVAL,
+                 ttl: float = EVENT_TTL) -> None:
+        self.path: str = path
+        self.poll_interval: float = poll_interval
+        self.ttl: float = ttl
+        self._ready: bool = False
+        self._subscribers: set[Subscription] = set()
+        self._last_id: int = 0
+        self._poller: Thread | None = None
+        self._lock: Lock = Lock()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        if not self._ready:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                               "channel TEXT NOT NULL, name TEXT NOT NULL, data TEXT NOT NULL, "
+                               "created_at REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS events_created_at ON events (created_at)")
+            self._ready = True
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def publish(self, channel: str, name: str, data: dict) -> None:
+        # Live updates are best effort: a failure here must never fail the write that triggered it
+        try:
+            with self._connect() as connection:
+                connection.execute("INSERT INTO events (channel, name, data, created_at) VALUES (?, ?, ?, ?)",
+                                   (channel, name, json.dumps(data, default=str), time.time()))
+        except sqlite3.Error:
+            logger.exception("Event publish failed")
+
+    def last_id(self) -> int:
+        with self._connect() as connection:
+            return connection.execute("SELECT coalesce(max(id), 0) FROM events").fetchone()[0]
+
+    def since(self, last_id: int, channels: set[str] | None = None) -> list[Event]:
+        with self._connect() as connection:
+            rows = connection.execute(f"SELECT {', '.join(EVENT_COLUMNS)} FROM events WHERE id > ? ORDER BY id",
+                                      (last_id,)).fetchall()
+        events = [Event(*row) for row in rows]
+        return [event for event in events if channels is None or event.channel in channels]
+
+    def subscribe(self, subscription: Subscription) -> Subscription:
+        with self._lock:
+            if not self._subscribers:
+                # Nobody was listening, so start from now rather than replaying what was missed
+                self._last_id = self.last_id()
+            subscription.after = self._last_id
+            self._subscribers.add(subscription)
+            if self._poller is None:
+                self._poller = Thread(target=self._poll, daemon=True)
+                self._poller.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _poll(self) -> None:
+        pruned = time.time()
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                with self._lock:
+                    if not self._subscribers:
+                        continue
+                    events = self.since(last_id=self._last_id)
+                    if events:
+                        self._last_id = events[-1].id
+                    subscribers = list(self._subscribers)
+                for event in events:
+                    for subscription in subscribers:
+                        if event.channel in subscription.channels:
+                            subscription.deliver(event)
+                if time.time() - pruned > self.ttl:
+                    pruned = time.time()
+                    with self._connect() as connection:
+                        connection.execute("DELETE FROM events WHERE created_at < ?", (pruned - self.ttl,))
+            except Exception:
+                logger.exception("Event poll failed")
+
+
+broker = EventBroker()
@@ -1,14 +1,33 @@
+import csv
+import functools
+import gzip
+import hashlib
+import json
 import random
 import string
-from typing import Literal
+import zlib
+from datetime import datetime, timezone
+from typing import Callable, Iterator, Literal
 
-from faker import Faker
-from flask import (Flask, flash, jsonify, redirect, render_template, request,
-                   send_file, session)
+import click
+from flask import (Flask, flash, jsonify, make_response, redirect, render_template, request,
+                   send_file, session, stream_with_context)
 from flask.wrappers import Response
+from werkzeug.datastructures import Accept, ETags
 from werkzeug.wrappers import Response
 
-from contacts import Archiver, Contact
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from cache import cache
+from contacts import (BATCH_MAX_OPERATIONS, Archiver, Contact, ContactRecord, decode_cursor, encode_cursor,
+                      next_cursor, page_size, migrate, pool_stats, replicas, result_cache_readable,
+                      result_cache_writable, search_index, session as db_session)
+from events import Event, Subscription, broker
+from jobs import Job, job_runner, job_store
+from metrics import init_app as init_metrics, metrics
 
 # ========================================================
 # Flask App
@@ -18,6 +37,111 @@ app = Flask(import_name=__name__)
 
 app.secret_key = b'hypermedia rocks'
 
+init_metrics(app)
+
+COMPRESS_MIN_SIZE = 1024
+CONTACTS_REPRESENTATIONS = ["application/json", "application/x-ndjson"]
+EVENT_KEEPALIVE = 15
+
+
+def gzip_stream(chunks: Iterator[str]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed: bytes = compressor.compress(chunk.encode('utf-8'))
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def cache_validators(full_path: str, if_none_match: ETags, if_modified_since: datetime | None,
+                     representation: str = "") -> tuple[str, datetime, bool]:
+    # Validators come from the data version, so freshness is decided without running a query. Routes that
+    # negotiate their media type pass the chosen one, so each representation gets its own tag
+    etag: str = hashlib.sha1(f"{cache.version_tag()} {full_path} {representation}".encode()).hexdigest()
+    last_modified = datetime.fromtimestamp(int(cache.changed_at()), tz=timezone.utc)
+    # Compressed representations carry a suffixed tag, see compress_body
+    matched: str | None = next((tag for tag in (etag, etag + "-gzip", etag + "-br") if tag in if_none_match), None)
+    if if_none_match:
+        return matched or etag, last_modified, matched is not None
+    return etag, last_modified, if_modified_since is not None and if_modified_since >= last_modified
+
+
+def compress_body(body: bytes, accept_encodings: Accept) -> tuple[bytes, str | None]:
+    if len(body) < COMPRESS_MIN_SIZE:
+        return body, None
+    if brotli is not None and accept_encodings["br"]:
+        return brotli.compress(body), "br"
+    if accept_encodings["gzip"]:
+        return gzip.compress(body, compresslevel=6), "gzip"
+    return body, None
+
+
+def conditional(view: Callable | None = None, representations: list[str] | None = None) -> Callable:
+    # `representations` lists the media types a view picks between by Accept header
+    if view is None:
+        return functools.partial(conditional, representations=representations)
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs) -> Response:
+        representation: str = (request.accept_mimetypes.best_match(representations) or "") if representations else ""
+        etag, last_modified, fresh = cache_validators(full_path=request.full_path,
+                                                      if_none_match=request.if_none_match,
+                                                      if_modified_since=request.if_modified_since,
+                                                      representation=representation)
+        response: Response = Response(status=304) if fresh else make_response(view(*args, **kwargs))
+        if response.status_code in (200, 304):
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.cache_control.no_cache = True
+        if representations:
+            response.vary.add("Accept")
+        return response
+    return wrapper
+
+
+@app.after_request
+def compress_response(response: Response) -> Response:
+    if (not request.path.startswith("/api/") or response.status_code != 200 or response.direct_passthrough
+            or response.is_streamed or "Content-Encoding" in response.headers):
+        return response
+    body, encoding = compress_body(body=response.get_data(), accept_encodings=request.accept_encodings)
+    if encoding is None:
+        return response
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak=weak)
+    return response
+
+
+@app.before_request
+def restore_recent_write() -> None:
+    # With read replicas, the request after a form post (the redirect target) must still see the write
+    if replicas.replicas and "wrote_at" in session:
+        db_session.info["wrote_at"] = session["wrote_at"]
+
+
+@app.after_request
+def remember_recent_write(response: Response) -> Response:
+    if replicas.replicas:
+        wrote_at: float | None = db_session.info.get("wrote_at")
+        if wrote_at and wrote_at != session.get("wrote_at"):
+            session["wrote_at"] = wrote_at
+    return response
+
+
+@app.teardown_appcontext
+def remove_db_session(error) -> None:
+    # Hand the request's connection back to the pool and drop any half-finished transaction
+    db_session.remove()
+
+
+def current_archiver() -> Archiver:
+    # Each browser session tracks its own archive job
+    return Archiver.get(job_id=session.get("archive_job"))
+
 
 @app.route(rule="/")
 def index() -> Response:
@@ -27,15 +151,33 @@ def index() -> Response:
 @app.route(rule="/contacts")
 def contacts() -> str:
     search: str | None = request.args.get(key="q")
-    _: int | str = request.args.get(key="page", default=0)
+    after: str | None = request.args.get(key="after")
+    size: int = page_size(request.args.get(key="size"))
 
     try:
-        if search is not None and request.headers.get(key='HX-Trigger') == 'search':
-            contacts_set: list[Contact] = Contact.search(text=search)
-            return render_template(template_name_or_list="rows.html", contacts=contacts_set)
-
-        contacts_set = Contact.all()
-        return render_template(template_name_or_list="index.html", contacts=contacts_set, archiver=Archiver.get())
+        fragment: bool = request.headers.get(key='HX-Trigger') in ('search', 'load-more')
+        if fragment:
+            # Rendered rows are cached per query, cursor and page size under the current data version
+            key: str = cache.key("rows.html", search, after, size)
+            rows_html = cache.get(key) if result_cache_readable() else None
+            if rows_html is not None:
+                return rows_html
+
+        if search is not None:
+            contacts_set: list[ContactRecord] = Contact.search(text=search, after=after, size=size)
+            cursor: str | None = next_cursor(contacts=contacts_set, size=size, offset=decode_cursor(cursor=after) or 0)
+        else:
+            contacts_set = Contact.all(after=after, size=size)
+            cursor = next_cursor(contacts=contacts_set, size=size)
+
+        if fragment:
+            rows_html = render_template(template_name_or_list="rows.html", contacts=contacts_set, cursor=cursor,
+                                        size=size)
+            if result_cache_writable():
+                cache.set(key, rows_html)
+            return rows_html
+        return render_template(template_name_or_list="index.html", contacts=contacts_set, cursor=cursor, size=size,
+                               archiver=current_archiver())
     except Exception as e:
         session.rollback()
         raise e
@@ -43,32 +185,41 @@ def contacts() -> str:
 
 @app.route(rule="/contacts/archive", methods=["POST"])
 def start_archive() -> str:
-    archiver: Archiver = Archiver.get()
+    archiver: Archiver = current_archiver()
     archiver.run()
+    if archiver.job:
+        session["archive_job"] = archiver.job.id
     return render_template(template_name_or_list="archive_ui.html", archiver=archiver)
 
 
 @app.route(rule="/contacts/archive", methods=["GET"])
 def archive_status() -> str:
-    archiver: Archiver = Archiver.get()
+    archiver: Archiver = current_archiver()
     return render_template(template_name_or_list="archive_ui.html", archiver=archiver)
 
 
 @app.route(rule="/contacts/archive/file", methods=["GET"])
 def archive_content() -> Response:
-    archiver: Archiver = Archiver.get()
-    return send_file(
-        path_or_file=archiver.archive_file(),
-        mimetype="text/csv",
-        as_attachment=True,
-        download_name="archive.csv"
-    )
+    archiver: Archiver = current_archiver()
+    path: str | None = archiver.archive_file()
+    if path:
+        return send_file(path_or_file=path, mimetype="text/csv", as_attachment=True, download_name="archive.csv")
+
+    # No finished job for this session: stream a fresh export straight from the database
+    chunks: Iterator[str] | Iterator[bytes] = archiver.archive_chunks()
+    headers: dict[str, str] = {"Content-Disposition": "attachment; filename=archive.csv"}
+    if request.accept_encodings["gzip"]:
+        chunks = gzip_stream(chunks=chunks)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return Response(stream_with_context(chunks), mimetype="text/csv", headers=headers)
 
 
 @app.route(rule="/contacts/archive", methods=["DELETE"])
 def reset_archive() -> str:
-    archiver: Archiver = Archiver.get()
+    archiver: Archiver = current_archiver()
     archiver.reset()
+    session.pop("archive_job", None)
     return render_template(template_name_or_list="archive_ui.html", archiver=archiver)
 
 
@@ -78,6 +229,88 @@ def contacts_count() -> str:
     return "(" + str(object=count) + " total Contacts)"
 
 
+def sse_format(name: str, data: str, id_: int | None = None) -> str:
+    lines: list[str] = [f"id: {id_}"] if id_ is not None else []
+    lines.append(f"event: {name}")
+    lines.extend(f"data: {line}" for line in data.splitlines() or [""])
+    return "\n".join(lines) + "\n\n"
+
+
+def event_channels(archive_job: str | None) -> set[str]:
+    return {f"job:{archive_job}"} if archive_job is not None else {"contacts"}
+
+
+def job_message(job_id: str) -> tuple[str, bool]:
+    # Returns the message for the job's current state and whether the job is over
+    job: Job | None = job_store.get(job_id)
+    if job is None or job.status != "Running":
+        return sse_format(name="done", data=job.status if job else "Cleared"), True
+    html: str = app.jinja_env.get_template("archive_progress.html").render(progress=job.progress())
+    return sse_format(name="progress", data=html), False
+
+
+def event_message(event: Event) -> tuple[str | None, bool]:
+    if event.name == "job":
+        return job_message(job_id=event.data["id"])
+    if event.name == "contacts":
+        html: str = app.jinja_env.get_template("contact_changes.html").render(change=event.data)
+        return sse_format(name="contacts", data=html, id_=event.id), False
+    return None, False
+
+
+def event_stream(channels: set[str], archive_job: str | None, last_event_id: int | None,
+                 wait: bool = True) -> Iterator[str]:
+    subscription: Subscription = broker.subscribe(Subscription(channels=channels))
+    # Everything up to this id has been sent or was published before the stream started
+    cursor: int = last_event_id if last_event_id is not None else subscription.after
+    try:
+        yield "retry: 3000\n\n"
+        if archive_job is not None:
+            # The job may have moved on (or finished) before the browser connected
+            message, done = job_message(job_id=archive_job)
+            yield message
+            if done:
+                return
+        if last_event_id is not None:
+            for event in broker.since(last_id=last_event_id, channels=channels):
+                message, _ = event_message(event=event)
+                cursor = max(cursor, event.id)
+                if message:
+                    yield message
+        while True:
+            event: Event | None = subscription.get(timeout=EVENT_KEEPALIVE if wait else 0)
+            if event is None:
+                if not wait:
+                    # An id-only message sets the browser's Last-Event-ID, so the next poll replays what it missed
+                    yield f"id: {cursor}\n\n"
+                    return
+                yield ": keepalive\n\n"
+                continue
+            cursor = max(cursor, event.id)
+            message, done = event_message(event=event)
+            if message:
+                yield message
+            if done:
+                return
+    finally:
+        broker.unsubscribe(subscription)
+
+
+@app.route(rule="/events", methods=["GET"])
+def events() -> Response:
+    # Archive progress follows this browser session's job; an empty id reports "done" straight away
+    archive_job: str | None = (session.get("archive_job", "") if request.args.get(key="channel") == "archive"
+                               else None)
+    last_event_id: str = request.headers.get("Last-Event-ID", "")
+    # An open stream would hold a WSGI worker thread for as long as the page is open, so here the stream sends
+    # what is pending and ends, and the browser polls by reconnecting after the `retry` delay. asgi.py serves
+    # /events itself and keeps its streams open, since there a stream only costs a coroutine
+    stream = event_stream(channels=event_channels(archive_job=archive_job), archive_job=archive_job,
+                          last_event_id=int(last_event_id) if last_event_id.isdigit() else None, wait=False)
+    return Response(stream, mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @app.route(rule="/contacts/new", methods=['GET'])
 def contacts_new_get() -> str:
     return render_template(template_name_or_list="new.html", contact=Contact())
@@ -135,12 +368,9 @@ def contacts_edit_post(contact_id: int = -1) -> Response | str:
 
 @app.route(rule="/contacts/<int:contact_id>/email", methods=["GET"])
 def contacts_email_get(contact_id: int = -1) -> str:
-    c: Contact | None = Contact.find(id_=contact_id)
-    if c:
-        c.email = request.args.get(key='email', default='')
-        _: bool = c.validate()
-        return c.errors.get('email', '')
-    return ''
+    c = Contact(id_=contact_id, email=request.args.get(key='email', default=''))
+    _: bool = c.validate_email()
+    return c.errors.get('email', '')
 
 
 @app.route(rule="/contacts/<int:contact_id>", methods=["DELETE"])
@@ -158,20 +388,17 @@ def contacts_delete(contact_id: int = -1) -> Response | str:
 @app.route(rule="/contacts/", methods=["DELETE"])
 def contacts_delete_all() -> str:
     contact_ids = list(map(int, request.form.getlist(key="selected_contact_ids")))
-    for contact_id in contact_ids:
-        contact: Contact | None = Contact.find(id_=contact_id)
-        if contact:
-            contact.delete()
+    _: int = Contact.delete_many(ids=contact_ids)
     flash(message="Deleted Contacts!")
-    contacts_set: list[Contact] = Contact.all(page=0)
-    archiver: Archiver = Archiver.get()
-    return render_template(template_name_or_list="index.html", contacts=contacts_set, archiver=archiver)
+    size: int = page_size()
+    contacts_set: list[ContactRecord] = Contact.all(size=size)
+    archiver: Archiver = current_archiver()
+    return render_template(template_name_or_list="index.html", contacts=contacts_set,
+                           cursor=next_cursor(contacts=contacts_set, size=size), size=size, archiver=archiver)
 
 
-@app.route(rule="/mock")
-def generate_mock_data() -> Response:
-    def generate_email(first_name, last_name) -> str:
-        email_domains: list[str] = [
+def generate_email(first_name, last_name) -> str:
+    email_domains: list[str] = [
         "gmail.com",
         "yahoo.com",
         "hotmail.com",
@@ -183,37 +410,59 @@ def generate_mock_data() -> Response:
         "fastmail.com",
         "yandex.com"
     ]
-        formats: list[str] = [
-            f"{first_name.lower()}.{last_name.lower()}",
-            f"{first_name.lower()}_{last_name.lower()}",
-            f"{first_name.lower()}{last_name.lower()}",
-            f"{last_name.lower()}.{first_name.lower()}",
-            f"{first_name.lower()}{random.randint(1, 999)}",
-            f"{last_name.lower()}{random.randint(1, 999)}",
-            f"{first_name.lower()}.{last_name.lower()}{random.randint(1, 99)}",
-            f"{first_name.lower()[0]}{last_name.lower()}",
-            f"{first_name.lower()}.{last_name.lower()[0]}",
-            f"{''.join(random.choices(population=string.ascii_lowercase, k=8))}"
-        ]
-
-        domain: str = random.choice(seq=email_domains)
-        username: str = random.choice(seq=formats)
-        return f"{username}@{domain}"
-    
-    count = int(request.args.get('i', 10))
+    formats: list[str] = [
+        f"{first_name.lower()}.{last_name.lower()}",
+        f"{first_name.lower()}_{last_name.lower()}",
+        f"{first_name.lower()}{last_name.lower()}",
+        f"{last_name.lower()}.{first_name.lower()}",
+        f"{first_name.lower()}{random.randint(1, 999)}",
+        f"{last_name.lower()}{random.randint(1, 999)}",
+        f"{first_name.lower()}.{last_name.lower()}{random.randint(1, 99)}",
+        f"{first_name.lower()[0]}{last_name.lower()}",
+        f"{first_name.lower()}.{last_name.lower()[0]}",
+        f"{''.join(random.choices(population=string.ascii_lowercase, k=8))}"
+    ]
+
+    domain: str = random.choice(seq=email_domains)
+    username: str = random.choice(seq=formats)
+    return f"{username}@{domain}"
+
+
+def generate_contacts(count: int) -> Iterator[Contact]:
+    # Imported here: Faker is slow to import and only mock data needs it
+    from faker import Faker
 
     fake = Faker()
+    # Faker's weighted name lookups cost more than the insert itself; draw a pool once and sample from it
+    pool_size: int = min(count, 1000)
+    first_names: list[str] = [fake.first_name() for _ in range(pool_size)]
+    last_names: list[str] = [fake.last_name() for _ in range(pool_size)]
 
     for _ in range(count):
-        first_name: str = fake.first_name()
-        last_name: str = fake.last_name()
+        first_name: str = random.choice(seq=first_names)
+        last_name: str = random.choice(seq=last_names)
         email: str = generate_email(first_name, last_name)
         phone: str = fake.phone_number()
 
-        contact = Contact(first=first_name, last=last_name, email=email, phone=phone)
-        contact.save()
+        yield Contact(first=first_name, last=last_name, email=email, phone=phone)
+
+
+@app.route(rule="/mock")
+def generate_mock_data() -> Response:
+    count = int(request.args.get('i', 10))
+
+    if request.args.get('background'):
+        def run_mock(job: Job) -> None:
+            job_store.update(job.id, total=count)
+            _ = Contact.bulk_insert(contacts=generate_contacts(count=count),
+                                    on_batch=lambda done: job_store.update(job.id, done=done))
+
+        _ = job_runner.submit(kind="mock", target=run_mock)
+        flash(message=f"Generating {count} mock contacts in the background.")
+        return redirect(location="/contacts")
 
-    flash(message=f"Generated {count} mock contacts.")
+    inserted: int = Contact.bulk_insert(contacts=generate_contacts(count=count))
+    flash(message=f"Generated {inserted} mock contacts.")
     return redirect(location="/contacts")
 
 
@@ -233,10 +482,39 @@ def page_not_found() -> tuple[str, Literal[404]]:
 # ===========================================================
 
 
+def ndjson_export() -> tuple[Response, int] | Response:
+    since: str = request.args.get(key="since", default="")
+    since_id: int | None = None
+    since_time: datetime | None = None
+    if since.isdigit():
+        since_id = int(since)
+    elif since:
+        try:
+            since_time = datetime.fromisoformat(since)
+        except ValueError:
+            return jsonify({"error": "since must be a contact id or an ISO 8601 timestamp"}), 400
+
+    def generate() -> Iterator[str]:
+        for records in Contact.stream_records(since_id=since_id, since_time=since_time):
+            yield "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+@app.route(rule="/api/v0/contacts.ndjson", methods=["GET"])
+def json_contacts_ndjson() -> tuple[Response, int] | Response:
+    return ndjson_export()
+
+
 @app.route(rule="/api/v0/contacts", methods=["GET"])
-def json_contacts() -> Response:
-    contacts_set: list[Contact] = Contact.all()
-    return jsonify({"contacts": [c.__dict__ for c in contacts_set]})
+@conditional(representations=CONTACTS_REPRESENTATIONS)
+def json_contacts() -> tuple[Response, int] | Response:
+    if request.accept_mimetypes.best_match(CONTACTS_REPRESENTATIONS) == "application/x-ndjson":
+        return ndjson_export()
+    size: int = page_size(request.args.get(key="size"))
+    contacts_set: list[ContactRecord] = Contact.all(after=request.args.get(key="after"), size=size)
+    return jsonify({"contacts": [c.to_dict() for c in contacts_set],
+                    "next": next_cursor(contacts=contacts_set, size=size)})
 
 
 @app.route(rule="/api/v0/contacts", methods=["POST"])
@@ -247,15 +525,111 @@ def json_contacts_new() -> tuple[Response, int] | Response:
                 phone=request.form.get(key='phone'),
                 email=request.form.get(key='email'))
     if c.save():
-        return jsonify(c.__dict__)
+        return jsonify(c.to_dict())
     return jsonify({"errors": c.errors}), 399
 
 
+@app.route(rule="/api/v0/contacts", methods=["DELETE"])
+def json_contacts_delete_many() -> tuple[Response, int] | Response:
+    data = request.get_json(silent=True) or {}
+    try:
+        contact_ids = list(map(int, data.get("ids") or request.form.getlist(key="ids")))
+    except (TypeError, ValueError):
+        return jsonify({"error": "ids must be a list of integers"}), 400
+    return jsonify({"success": True, "deleted": Contact.delete_many(ids=contact_ids)})
+
+
+def import_records(stream, ndjson: bool) -> Iterator[tuple[int, dict | None, str | None]]:
+    # Decode and parse the upload incrementally so the body is never held in memory. Lines are decoded one at a
+    # time, so a record that is not valid UTF-8 fails on its own row
+    invalid: list[bool] = []
+
+    def lines() -> Iterator[str]:
+        for raw in stream:
+            try:
+                yield raw.decode("utf-8")
+            except UnicodeDecodeError:
+                invalid.append(True)
+                yield raw.decode("utf-8", errors="replace")
+
+    def records() -> Iterator[tuple[int, dict | str]]:
+        if not ndjson:
+            yield from enumerate(csv.DictReader(lines()), start=1)
+            return
+        yield from ((number, line) for number, line in enumerate(lines(), start=1) if line.strip())
+
+    for number, item in records():
+        if invalid:
+            invalid.clear()
+            yield number, None, "Invalid UTF-8"
+            continue
+        if not ndjson:
+            yield number, item, None
+            continue
+        try:
+            record = json.loads(item)
+        except ValueError:
+            yield number, None, "Invalid JSON"
+            continue
+        if not isinstance(record, dict):
+            yield number, None, "Expected a JSON object"
+            continue
+        yield number, record, None
+
+
+@app.route(rule="/api/v0/cache", methods=["GET"])
+def json_cache_stats() -> Response:
+    return jsonify(cache.stats())
+
+
+@app.route(rule="/metrics", methods=["GET"])
+def metrics_text() -> Response:
+    # Point-in-time gauges are refreshed on scrape; counters and histograms accumulate as requests run
+    for name, value in pool_stats().items():
+        if isinstance(value, int):
+            metrics.set("db_pool_connections", value, state=name)
+    stats: dict = cache.stats()
+    metrics.set("cache_entries", stats["entries"], backend=stats["backend"])
+    metrics.set("cache_lookups_total", stats["hits"], result="hit")
+    metrics.set("cache_lookups_total", stats["misses"], result="miss")
+    return Response(response=metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.route(rule="/api/v0/pool", methods=["GET"])
+def json_pool_stats() -> Response:
+    return jsonify(pool_stats())
+
+
+@app.route(rule="/api/v0/contacts/import", methods=["POST"])
+def json_contacts_import() -> tuple[Response, int]:
+    upload = request.files.get(key="file")
+    stream = upload.stream if upload else request.stream
+    mimetype: str = upload.mimetype if upload else request.mimetype
+    filename: str = (upload.filename or "") if upload else ""
+    ndjson: bool = (request.args.get(key="format") == "ndjson" or "ndjson" in mimetype or "jsonl" in mimetype
+                    or filename.endswith((".ndjson", ".jsonl")))
+    # Rows that fail, unreadable ones included, are listed in the report; the rest are still imported
+    report: dict = Contact.import_rows(records=import_records(stream=stream, ndjson=ndjson))
+    return jsonify(report), 200
+
+
+@app.route(rule="/api/v0/contacts/batch", methods=["POST"])
+def json_contacts_batch() -> tuple[Response, int] | Response:
+    data = request.get_json(silent=True)
+    operations = data.get("operations") if isinstance(data, dict) else data
+    if not isinstance(operations, list):
+        return jsonify({"error": "Expected a list of operations"}), 400
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        return jsonify({"error": f"At most {BATCH_MAX_OPERATIONS} operations per batch"}), 413
+    return jsonify({"results": Contact.batch(operations=operations)})
+
+
 @app.route(rule="/api/v0/contacts/<int:contact_id>", methods=["GET"])
+@conditional
 def json_contacts_view(contact_id: int = -1) -> tuple[Response, int] | Response:
     contact: Contact | None = Contact.find(contact_id)
     if contact:
-        return jsonify(contact.__dict__)
+        return jsonify(contact.to_dict())
     else:
         return jsonify({'error': 'Contact not found'}), 404
 
@@ -269,7 +643,7 @@ def json_contacts_edit(contact_id: int) -> tuple[Response, int] | Response:
                  phone=request.form['phone'],
                  email=request.form['email'])
         if c.save():
-            return jsonify(c.__dict__)
+            return jsonify(c.to_dict())
 
         return jsonify({"errors": c.errors}), 399
     else:
@@ -286,6 +660,60 @@ def json_contacts_delete(contact_id: int = -1) -> tuple[Response, int] | Respons
         return jsonify({"success": False}), 404
 
 
+@app.route(rule="/api/v0/dedup", methods=["POST"])
+def json_dedup_start() -> tuple[Response, int]:
+    # The dedup module is imported where it is used: it pulls in multiprocessing and the process pool, which
+    # a cold start serving contacts never needs
+    from dedup import run_dedup
+    incremental: bool = request.args.get(key="incremental", default="") in ("1", "true", "yes")
+    job: Job = job_runner.submit(kind="dedup", target=functools.partial(run_dedup, incremental=incremental))
+    return jsonify({"job": job.id, "incremental": incremental}), 202
+
+
+@app.route(rule="/api/v0/dedup", methods=["GET"])
+def json_dedup_status() -> Response:
+    from dedup import recent_runs
+    job: Job | None = job_store.get(request.args.get(key="job"))
+    return jsonify({
+        "job": {"id": job.id, "status": job.status, "progress": job.progress(), "error": job.error} if job else None,
+        "runs": recent_runs(),
+    })
+
+
+@app.route(rule="/api/v0/dedup/candidates", methods=["GET"])
+def json_dedup_candidates() -> tuple[Response, int] | Response:
+    from dedup import list_candidates
+    try:
+        min_score: float = float(request.args.get(key="min_score", default=0))
+    except ValueError:
+        return jsonify({"error": "min_score must be a number"}), 400
+    size: int = page_size(request.args.get(key="size"))
+    candidates: list[dict] = list_candidates(status=request.args.get(key="status", default="pending"),
+                                             after=request.args.get(key="after"), size=size, min_score=min_score)
+    after: str | None = encode_cursor(candidates[-1]["id"]) if len(candidates) == size else None
+    return jsonify({"candidates": candidates, "next": after})
+
+
+@app.route(rule="/api/v0/dedup/candidates/<int:candidate_id>/merge", methods=["POST"])
+def json_dedup_merge(candidate_id: int) -> tuple[Response, int] | Response:
+    from dedup import review_candidate
+    keep: str | None = request.args.get(key="keep")
+    result: dict | None = review_candidate(candidate_id=candidate_id, merge=True,
+                                           keep_id=int(keep) if keep and keep.isdigit() else None)
+    if result:
+        return jsonify(result)
+    return jsonify({"error": "Candidate not found or already reviewed"}), 404
+
+
+@app.route(rule="/api/v0/dedup/candidates/<int:candidate_id>/dismiss", methods=["POST"])
+def json_dedup_dismiss(candidate_id: int) -> tuple[Response, int] | Response:
+    from dedup import review_candidate
+    result: dict | None = review_candidate(candidate_id=candidate_id, merge=False)
+    if result:
+        return jsonify(result)
+    return jsonify({"error": "Candidate not found or already reviewed"}), 404
+
+
 # ===========================================================
 # Error Handlers
 # ===========================================================
@@ -311,5 +739,34 @@ def handle_exception(error) -> Response | tuple[str, Literal[500]]:
         return render_template(template_name_or_list='500.html'), 500
 
 
+# ===========================================================
+# CLI Commands
+# ===========================================================
+
+
+@app.cli.command("migrate")
+def migrate_database() -> None:
+    # Run on deploy with AUTO_MIGRATE=0 so cold starts skip the schema check
+    migrate()
+    print("Database migrated.")
+
+
+@app.cli.command("search-index")
+def rebuild_search_index() -> None:
+    # Creates the search index if needed and backfills it from existing rows
+    search_index.rebuild()
+    print("Search index rebuilt.")
+
+
+@app.cli.command("dedup")
+@click.option("--incremental", is_flag=True, help="Only check contacts changed since the last run.")
+def find_duplicates(incremental: bool) -> None:
+    # Same work as POST /api/v0/dedup, in the foreground
+    from dedup import Deduplicator
+    result: dict = Deduplicator().run(incremental=incremental)
+    print(f"Dedup ({result['mode']}): {result['contacts']} contacts indexed, "
+          f"{result['candidates']} new merge candidates.")
+
+
 if __name__ == "__main__":
     app.run()
\ No newline at end of file
@@ -0,0 +1,206 @@
+import glob
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, suppress
+from threading import Lock, Thread
+from typing import Callable, Iterator
+
+from events import broker
+from metrics import record_job
+
+# Background Jobs
+# ========================================================
+# Job state lives in a small SQLite file so every worker process on the host sees the same jobs;
+# the work itself runs on a per-process thread pool. Each runner stamps a heartbeat on the jobs it is
+# running, so a job whose process died is failed by the next sweep instead of showing Running forever.
+
+JOB_DB_PATH = os.environ.get("JOB_DB_PATH", os.path.join(tempfile.gettempdir(), "contact_app_jobs.db"))
+JOB_DIR = os.environ.get("JOB_DIR", os.path.join(tempfile.gettempdir(), "contact_app_jobs"))
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 4))
+# Progress-only updates are published at most this often per job; status changes always are
+JOB_EVENT_INTERVAL = float(os.environ.get("JOB_EVENT_INTERVAL", 0.25))
+JOB_TTL = float(os.environ.get("JOB_TTL", 3600))
+JOB_SWEEP_INTERVAL = float(os.environ.get("JOB_SWEEP_INTERVAL", 300))
+JOB_HEARTBEAT_INTERVAL = float(os.environ.get("JOB_HEARTBEAT_INTERVAL", 30))
+JOB_STALE_AFTER = float(os.environ.get("JOB_STALE_AFTER", 4 * JOB_HEARTBEAT_INTERVAL))
+
+JOB_COLUMNS = ["id", "kind", "status", "done", "total", "path", "error", "created_at", "updated_at"]
+
+logger = logging.getLogger("contact_app.jobs")
+
+
+class Job:
+    def __init__(self, id_: str, kind: str, status: str = "Running", done: int = 0, total: int = 0,
+                 path: str | None = None, error: str | None = None, created_at: float = 0,
+                 updated_at: float = 0) -> None:
+        self.id: str = id_
+        self.kind: str = kind
+        self.status: str = status
+        self.done: int = done
+        self.total: int = total
+        self.path: str | None = path
+        self.error: str | None = error
+        self.created_at: float = created_at
+        self.updated_at: float = updated_at
+
+    def progress(self) -> float:
+        if self.status == "Complete":
+            return 1
+        if self.total <= 0:
+            return 0
+        return min(self.done / self.total, 1)
+
+
+class JobStore:
+    def __init__(self, path: str = JOB_DB_PATH) -> None:
+        self.path: str = path
+        # The schema is created on first use, not at import
+        self._ready: bool = False
+        self._published: dict[str, float] = {}
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        if not self._ready:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, "
+                "done INTEGER NOT NULL DEFAULT 0, total INTEGER NOT NULL DEFAULT 0, path TEXT, error TEXT, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL, heartbeat REAL)")
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(jobs)")]
+            if "heartbeat" not in columns:
+                connection.execute("ALTER TABLE jobs ADD COLUMN heartbeat REAL")
+            self._ready = True
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def create(self, kind: str) -> Job:
+        now = time.time()
+        job = Job(id_=uuid.uuid4().hex, kind=kind, created_at=now, updated_at=now)
+        with self._connect() as connection:
+            connection.execute("INSERT INTO jobs (id, kind, status, created_at, updated_at, heartbeat) "
+                               "VALUES (?, ?, ?, ?, ?, ?)",
+                               (job.id, job.kind, job.status, job.created_at, job.updated_at, now))
+        return job
+
+    def get(self, job_id: str | None) -> Job | None:
+        if not job_id:
+            return None
+        with self._connect() as connection:
+            row = connection.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job(*row) if row else None
+
+    def update(self, job_id: str, **fields: object) -> None:
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields if name in JOB_COLUMNS)
+        with self._connect() as connection:
+            connection.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+        self.publish(job_id=job_id, fields=fields)
+
+    def publish(self, job_id: str, fields: dict) -> None:
+        now = fields["updated_at"]
+        progress_only = set(fields) <= {"done", "total", "updated_at"}
+        if progress_only and now - self._published.get(job_id, 0) < JOB_EVENT_INTERVAL:
+            return
+        if progress_only:
+            self._published[job_id] = now
+        else:
+            self._published.pop(job_id, None)
+        broker.publish(channel=f"job:{job_id}", name="job", data={"id": job_id, **fields})
+
+    def beat(self, job_ids: list[str]) -> None:
+        with self._connect() as connection:
+            connection.executemany("UPDATE jobs SET heartbeat = ? WHERE id = ? AND status = 'Running'",
+                                   [(time.time(), job_id) for job_id in job_ids])
+
+    def delete(self, job_id: str) -> None:
+        job = self.get(job_id)
+        if job and job.path:
+            with suppress(FileNotFoundError):
+                os.remove(job.path)
+        # Partial output of a job that never finished, named after the job like its final file; a running
+        # job's worker is still writing it and removes it itself once it sees the record gone
+        if job and job.status != "Running":
+            for path in glob.glob(os.path.join(JOB_DIR, glob.escape(job_id) + ".*.part")):
+                with suppress(FileNotFoundError):
+                    os.remove(path)
+        with self._connect() as connection:
+            connection.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def expired(self, ttl: float = JOB_TTL) -> list[str]:
+        with self._connect() as connection:
+            rows = connection.execute("SELECT id FROM jobs WHERE status != 'Running' AND updated_at < ?",
+                                      (time.time() - ttl,)).fetchall()
+        return [row[0] for row in rows]
+
+    def stale(self, after: float = JOB_STALE_AFTER) -> list[str]:
+        # Running jobs whose runner stopped stamping them; jobs created before heartbeats count from creation
+        with self._connect() as connection:
+            rows = connection.execute("SELECT id FROM jobs WHERE status = 'Running' "
+                                      "AND coalesce(heartbeat, updated_at) < ?", (time.time() - after,)).fetchall()
+        return [row[0] for row in rows]
+
+
+class JobRunner:
+    def __init__(self, store: JobStore, workers: int = JOB_WORKERS) -> None:
+        self.store: JobStore = store
+        self.workers: int = workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._sweeper: Thread | None = None
+        self._running: set[str] = set()
+        self._lock: Lock = Lock()
+
+    def submit(self, kind: str, target: Callable[[Job], None]) -> Job:
+        job = self.store.create(kind=kind)
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+                self._sweeper = Thread(target=self._sweep, daemon=True)
+                self._sweeper.start()
+            self._running.add(job.id)
+        self._executor.submit(self._run, job, target)
+        return job
+
+    def _run(self, job: Job, target: Callable[[Job], None]) -> None:
+        try:
+            target(job)
+            current = self.store.get(job.id)
+            if current and current.status == "Running":
+                self.store.update(job.id, status="Complete")
+            record_job(kind=job.kind, status="Complete" if current else "Cancelled")
+        except Exception as e:
+            self.store.update(job.id, status="Failed", error=str(object=e))
+            record_job(kind=job.kind, status="Failed", error=e)
+        finally:
+            with self._lock:
+                self._running.discard(job.id)
+
+    def _sweep(self) -> None:
+        swept_at = time.time()
+        while True:
+            time.sleep(JOB_HEARTBEAT_INTERVAL)
+            try:
+                with self._lock:
+                    running = list(self._running)
+                self.store.beat(job_ids=running)
+                if time.time() - swept_at < JOB_SWEEP_INTERVAL:
+                    continue
+                swept_at = time.time()
+                for job_id in self.store.stale():
+                    self.store.update(job_id, status="Failed", error="Job stopped responding")
+                for job_id in self.store.expired():
+                    self.store.delete(job_id)
+            except Exception:
+                logger.exception("Job sweep failed")
+
+
+os.makedirs(JOB_DIR, exist_ok=True)
+job_store = JobStore()
+job_runner = JobRunner(store=job_store)
@@ -0,0 +1,223 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+
+from flask import Flask, Response, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from tenacity import RetryCallState
+
+# Metrics
+# ========================================================
+# In-process counters and histograms rendered in the Prometheus text format at /metrics. Each worker
+# process keeps its own registry; scrape every worker (or sum by instance) when running several.
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1").lower() in ("1", "true", "yes")
+SLOW_QUERY_SECONDS = float(os.environ.get("SLOW_QUERY_MS", 200)) / 1000
+# Profiling runs arbitrary requests under cProfile and returns the stats, so it is off unless asked for
+PROFILE_REQUESTS = os.environ.get("PROFILE_REQUESTS", "").lower() in ("1", "true", "yes")
+PROFILE_HEADER = os.environ.get("PROFILE_HEADER", "X-Profile")
+PROFILE_LIMIT = int(os.environ.get("PROFILE_LIMIT", 50))
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "http_requests_total": ("counter", "HTTP requests by route, method and status."),
+    "http_request_duration_seconds": ("histogram", "Time spent in Flask handlers, by route."),
+    "http_request_queries": ("histogram", "SQL statements executed per request, by route."),
+    "db_queries_total": ("counter", "SQL statements executed."),
+    "db_query_duration_seconds": ("histogram", "SQL statement execution time."),
+    "db_slow_queries_total": ("counter", "SQL statements slower than SLOW_QUERY_MS."),
+    "db_errors_total": ("counter", "SQL statements that raised, by exception type."),
+    "db_retries_total": ("counter", "Statements retried by execute_with_retry."),
+    "db_retry_sleep_seconds_total": ("counter", "Time spent backing off before retries."),
+    "db_rollbacks_total": ("counter", "Session rollbacks."),
+    "db_reads_total": ("counter", "Session SELECTs by target when read replicas are configured."),
+    "jobs_total": ("counter", "Finished background jobs, by kind and status."),
+    "db_pool_connections": ("gauge", "Connection pool state."),
+    "cache_entries": ("gauge", "Entries in the result cache."),
+    "cache_lookups_total": ("counter", "Result cache lookups, by result."),
+}
+
+logger = logging.getLogger("contact_app.metrics")
+
+# Per-request query statistics, set by the Flask hooks and filled in by the engine listeners
+request_stats: ContextVar[dict | None] = ContextVar("request_stats", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets: tuple[float, ...] = buckets
+        self.counts: list[int] = [0] * (len(buckets) + 1)
+        self.sum: float = 0.0
+        self.count: int = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self._lock: Lock = Lock()
+        self._values: dict[str, dict[tuple, float]] = {}
+        self._histograms: dict[str, dict[tuple, Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values.setdefault(name, {})[tuple(sorted(labels.items()))] = value
+
+    def observe(self, name: str, value: float, buckets: tuple[float, ...] = LATENCY_BUCKETS, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram(buckets=buckets)
+            series[key].observe(value)
+
+    def value(self, name: str, **labels: str) -> float:
+        return self._values.get(name, {}).get(tuple(sorted(labels.items())), 0)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        with self._lock:
+            for name in sorted(self._values.keys() | self._histograms.keys()):
+                kind, description = HELP.get(name, ("untyped", name))
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in self._values.get(name, {}).items():
+                    lines.append(f"{name}{format_labels(labels)} {value:g}")
+                for labels, histogram in self._histograms.get(name, {}).items():
+                    cumulative = 0
+                    for bound, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+                        cumulative += count
+                        le = bound if isinstance(bound, str) else f"{bound:g}"
+                        lines.append(f"{name}_bucket{format_labels((*labels, ('le', le)))} {cumulative}")
+                    lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum:g}")
+                    lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def record_retry(retry_state: RetryCallState) -> None:
+    # tenacity before_sleep hook for execute_with_retry
+    error = retry_state.outcome.exception() if retry_state.outcome else None
+    sleep = retry_state.next_action.sleep if retry_state.next_action else 0
+    metrics.inc("db_retries_total")
+    metrics.inc("db_retry_sleep_seconds_total", value=sleep)
+    logger.warning("Retrying statement in %.1fs after %s: %s", sleep, type(error).__name__, error)
+
+
+def record_job(kind: str, status: str, error: Exception | None = None) -> None:
+    metrics.inc("jobs_total", kind=kind, status=status)
+    if error is not None:
+        logger.error("Job %s failed: %s", kind, error)
+
+
+def instrument_engine(engine: Engine) -> None:
+    if not METRICS_ENABLED:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        metrics.inc("db_queries_total")
+        metrics.observe("db_query_duration_seconds", elapsed)
+        stats = request_stats.get()
+        if stats is not None:
+            stats["queries"] += 1
+            stats["db_time"] += elapsed
+        if elapsed >= SLOW_QUERY_SECONDS:
+            metrics.inc("db_slow_queries_total")
+            logger.warning("Slow query (%.0f ms) during %s: %s", elapsed * 1000,
+                           stats["path"] if stats else "background work", " ".join(statement.split())[:500])
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context) -> None:
+        if context.connection is not None and context.connection.info.get("query_start"):
+            context.connection.info["query_start"].pop()
+        metrics.inc("db_errors_total", error=type(context.original_exception).__name__)
+        # Constraint violations are how duplicate emails are detected, so they are expected and only counted
+        if not isinstance(context.sqlalchemy_exception, IntegrityError):
+            logger.warning("Statement failed: %s", context.original_exception)
+
+
+def instrument_session(session_factory) -> None:
+    if not METRICS_ENABLED:
+        return
+
+    @event.listens_for(session_factory, "after_soft_rollback")
+    def after_soft_rollback(session, previous_transaction) -> None:
+        # Only count the outermost rollback, not one per nested transaction
+        if previous_transaction.parent is None:
+            metrics.inc("db_rollbacks_total")
+
+
+def init_app(app: Flask) -> None:
+    if not METRICS_ENABLED:
+        return
+
+    @app.before_request
+    def start_request() -> None:
+        request.environ["metrics.start"] = time.perf_counter()
+        request_stats.set({"queries": 0, "db_time": 0.0, "path": request.path})
+        if PROFILE_REQUESTS and request.headers.get(PROFILE_HEADER):
+            profiler = cProfile.Profile()
+            request.environ["metrics.profiler"] = profiler
+            profiler.enable()
+
+    @app.after_request
+    def finish_request(response: Response) -> Response:
+        start = request.environ.get("metrics.start")
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        stats = request_stats.get() or {"queries": 0, "db_time": 0.0}
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.inc("http_requests_total", route=route, method=request.method, status=str(response.status_code))
+        metrics.observe("http_request_duration_seconds", elapsed, route=route, method=request.method)
+        metrics.observe("http_request_queries", stats["queries"], buckets=(0, 1, 2, 5, 10, 25, 50, 100),
+                        route=route, method=request.method)
+        response.headers["Server-Timing"] = (f"app;dur={elapsed * 1000:.1f}, "
+                                             f"db;dur={stats['db_time'] * 1000:.1f};desc=\"{stats['queries']} queries\"")
+
+        profiler: cProfile.Profile | None = request.environ.pop("metrics.profiler", None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        output = io.StringIO()
+        sort = request.headers.get(PROFILE_HEADER)
+        sort = sort if sort in ("cumulative", "tottime", "calls", "ncalls") else "cumulative"
+        pstats.Stats(profiler, stream=output).sort_stats(sort).print_stats(PROFILE_LIMIT)
+        return Response(response=output.getvalue(), mimetype="text/plain")
+
+    @app.teardown_request
+    def end_request(error: BaseException | None = None) -> None:
+        # Worker threads are reused, so don't let one request's statistics leak into the next
+        request_stats.set(None)
@@ -0,0 +1,34 @@
+import re
+import unicodedata
+
+# Normalized Values
+# ========================================================
+# Shared by the indexed lookup columns (see contacts.py) and duplicate detection, so a phone number or
+# email means the same thing to both.
+
+
+def normalize_name(value: str | None) -> str:
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    return "".join(char for char in decomposed if char.isalpha()).lower()
+
+
+def phone_digits(value: str | None) -> str:
+    # "+1-843-747-7063x95291" and "(843) 747 7063" both become "8437477063": drop extensions and country code
+    number = re.split(r"[xX#]|ext", value or "", maxsplit=1)[0]
+    return re.sub(r"\D", "", number)[-10:]
+
+
+def phone_query_digits(value: str | None) -> str:
+    # A typed number may be partial, so the country code can't be cut by length as above; drop a leading
+    # "+1-", "001 " or trunk "1-" group instead, so "+1-843-747" searches for "843747"
+    number = re.sub(r"^\s*(?:\+\d{1,3}|00\d{1,3}|1)[\s.-]+", "", value or "")
+    return phone_digits(number)
+
+
+def email_local(value: str | None) -> str:
+    local = (value or "").lower().split("@")[0].split("+")[0]
+    return re.sub(r"[^a-z]", "", local)
+
+
+def email_lower(value: str | None) -> str:
+    return (value or "").strip().lower()
@@ -0,0 +1,41 @@
+import importlib
+import os
+import sys
+from types import ModuleType
+from typing import Callable, Iterator
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# In import order, so each module picks up fresh copies of the ones before it
+APP_MODULES = ["normalize", "metrics", "cache", "events", "jobs", "contacts", "contacts_async", "dedup", "index",
+               "asgi"]
+
+
+def unload() -> None:
+    contacts = sys.modules.get("contacts")
+    if contacts is not None and contacts._engine is not None:
+        contacts._engine.dispose()
+    for name in APP_MODULES:
+        sys.modules.pop(name, None)
+
+
+@pytest.fixture
+def load(tmp_path, monkeypatch) -> Iterator[Callable[..., ModuleType | tuple[ModuleType, ...]]]:
+    # The app modules read their settings and open their stores on import, so every test imports them fresh
+    # against its own SQLite files; `load("contacts", "index", EMAIL_INDEX="1")` returns the named modules
+    monkeypatch.syspath_prepend(ROOT)
+
+    def load_modules(*names: str, **env: str) -> ModuleType | tuple[ModuleType, ...]:
+        settings: dict[str, str] = {"CONNECTION_STRING": f"sqlite:///{tmp_path / 'contacts.db'}",
+                                    "EVENT_DB_PATH": str(tmp_path / "events.db"),
+                                    "JOB_DB_PATH": str(tmp_path / "jobs.db"), "JOB_DIR": str(tmp_path),
+                                    "CACHE_PATH": str(tmp_path / "cache.db"), **env}
+        for name, value in settings.items():
+            monkeypatch.setenv(name, value)
+        unload()
+        modules = tuple(importlib.import_module(name) for name in names)
+        return modules[0] if len(modules) == 1 else modules
+
+    yield load_modules
+    unload()
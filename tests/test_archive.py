@@ -0,0 +1,56 @@
+import csv
+import gzip
+import io
+import os
+
+NAMES = [("Smith, Jr.", 'O"Brien'), ("Line\nBreak", "Plain")]
+
+
+def seed(contacts) -> None:
+    Contact = contacts.Contact
+    Contact.bulk_insert(contacts=[Contact(first=first, last=last, phone="555-0100", email=f"c{n}@example.com")
+                                  for n, (first, last) in enumerate(NAMES)])
+
+
+def test_archive_chunks_quote_names(load) -> None:
+    contacts = load("contacts")
+    seed(contacts)
+    chunks = list(contacts.Archiver().archive_chunks(chunk_size=1))
+    # The header goes out before any rows are read, then one chunk per batch
+    assert chunks[0] == "id,first,last,phone,email\n"
+    assert len(chunks) == 1 + len(NAMES)
+    rows = list(csv.reader(io.StringIO("".join(chunks))))
+    assert [(row[1], row[2]) for row in rows[1:]] == NAMES
+
+
+def test_archive_download_streams_csv(load) -> None:
+    contacts, index = load("contacts", "index")
+    seed(contacts)
+    client = index.app.test_client()
+    response = client.get("/contacts/archive/file", headers={"Accept-Encoding": "gzip"})
+    assert response.is_streamed
+    assert response.headers["Content-Encoding"] == "gzip"
+    rows = list(csv.reader(io.StringIO(gzip.decompress(response.get_data()).decode())))
+    assert [(row[1], row[2]) for row in rows[1:]] == NAMES
+
+    plain = client.get("/contacts/archive/file")
+    assert "Content-Encoding" not in plain.headers
+    assert list(csv.reader(io.StringIO(plain.get_data(as_text=True)))) == rows
+
+
+def test_cancel_mid_run_leaves_no_files(load, monkeypatch) -> None:
+    contacts = load("contacts")
+    seed(contacts)
+    job = contacts.job_store.create(kind="archive")
+    archiver = contacts.Archiver(job=job)
+
+    def cancelled_chunks(**kwargs):
+        yield "id,first,last,phone,email\n"
+        # Cleared while the worker is still writing: the part file stays until the worker lets go of it
+        archiver.reset()
+        assert os.path.exists(os.path.join(contacts.JOB_DIR, job.id + ".csv.part"))
+        yield "1,Smith,Jr.,555-0100,c0@example.com\n"
+
+    monkeypatch.setattr(archiver, "archive_chunks", cancelled_chunks)
+    archiver.run_impl(job=job)
+    assert [name for name in os.listdir(contacts.JOB_DIR) if name.startswith(job.id)] == []
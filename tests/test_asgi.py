@@ -0,0 +1,17 @@
+from starlette.testclient import TestClient
+
+
+def test_asgi_imports_and_serves_against_sqlite_file(load) -> None:
+    asgi, contacts, contacts_async = load("asgi", "contacts", "contacts_async")
+    assert contacts_async._async_engine is None, "importing asgi must not create the async engine"
+    assert contacts._engine is None
+    with TestClient(asgi.app) as client:
+        # Lifespan startup migrated the fresh database before any native route read it
+        assert contacts._engine is not None
+        contacts.Contact(first="Ada", last="Lovelace", phone="555-0100", email="ada@example.com").save()
+        response = client.get("/api/v0/contacts")
+        assert response.status_code == 200
+        assert [contact["email"] for contact in response.json()["contacts"]] == ["ada@example.com"]
+        contact_id = response.json()["contacts"][0]["id"]
+        assert client.get(f"/api/v0/contacts/{contact_id}").json()["first"] == "Ada"
+        assert client.get("/contacts/count").status_code == 200
@@ -0,0 +1,13 @@
+def test_batch_rejects_non_string_fields_per_item(load) -> None:
+    contacts = load("contacts")
+    results = contacts.Contact.batch(operations=[
+        {"op": "create", "contact": {"first": "Ada", "email": "ada@example.com", "phone": "555-0100"}},
+        {"op": "create", "contact": {"email": 42, "phone": ["555"]}},
+        {"op": "update", "id": 1, "contact": {"phone": 5550101}},
+    ])
+    assert results[0]["status"] == 201
+    assert results[1] == {"op": "create", "id": None, "status": 400,
+                          "errors": {"phone": "Must be a string", "email": "Must be a string"}}
+    assert results[2]["status"] == 400
+    assert results[2]["errors"] == {"phone": "Must be a string"}
+    assert contacts.Contact.find(results[0]["id"]).phone == "555-0100"
@@ -0,0 +1,65 @@
+import time
+
+
+def test_bulk_insert_skips_duplicates_within_and_across_batches(load) -> None:
+    contacts = load("contacts")
+    Contact = contacts.Contact
+    assert Contact(email="taken@example.com").save()
+    emails = ["a@example.com", "a@example.com", "b@example.com", "taken@example.com", "a@example.com",
+              "c@example.com", None]
+    batches: list[int] = []
+    inserted = Contact.bulk_insert(contacts=[Contact(first=str(n), email=email) for n, email in enumerate(emails)],
+                                   batch_size=2, on_batch=batches.append)
+    assert inserted == 3
+    assert batches == [2, 4, 6, 7]
+    assert sorted(contact.email for contact in Contact.all()) == ["a@example.com", "b@example.com",
+                                                                  "c@example.com", "taken@example.com"]
+    # Within a batch the later row wins
+    assert Contact.find(2).first == "1"
+    assert Contact.count() == 4
+
+
+def test_rows_skipped_on_conflict_are_not_counted(load) -> None:
+    contacts = load("contacts")
+    assert contacts.Contact(email="taken@example.com").save()
+    # What a concurrent writer leaves behind: the existence check passed, then the insert conflicts
+    rows = [contacts.with_lookups({"first": None, "last": None, "phone": None, "email": email})
+            for email in ("taken@example.com", "new@example.com")]
+    assert contacts.insert_rows(statement=contacts.insert_statement(), rows=rows) == 1
+    contacts.session.commit()
+    contacts.session.close()
+
+
+def test_mock_reports_inserted_rows(load) -> None:
+    index = load("index")
+    client = index.app.test_client()
+    client.get("/mock?i=5")
+    with client.session_transaction() as session:
+        message = session["_flashes"][0][1]
+    assert message == f"Generated {index.Contact.count()} mock contacts."
+
+
+def test_failed_background_mock_marks_the_job_failed(load, monkeypatch) -> None:
+    index, jobs = load("index", "jobs")
+
+    def generate_contacts(count: int):
+        yield index.Contact(email="first@example.com")
+        raise RuntimeError("generator broke")
+
+    monkeypatch.setattr(index, "generate_contacts", generate_contacts)
+    submitted: list = []
+    submit = jobs.job_runner.submit
+
+    def record_submit(**kwargs):
+        submitted.append(submit(**kwargs))
+        return submitted[-1]
+
+    monkeypatch.setattr(jobs.job_runner, "submit", record_submit)
+    index.app.test_client().get("/mock?i=5&background=1")
+    deadline = time.monotonic() + 10
+    while jobs.job_store.get(submitted[0].id).status == "Running":
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    job = jobs.job_store.get(submitted[0].id)
+    assert job.status == "Failed"
+    assert job.error == "generator broke"
@@ -0,0 +1,30 @@
+import time
+
+
+def test_memory_caches_share_the_data_version(load, tmp_path) -> None:
+    cache_module = load("cache")
+    # Two workers on one host: separate entries, one version store
+    first = cache_module.MemoryCache(versions=cache_module.VersionStore(path=str(tmp_path / "versions.db")))
+    second = cache_module.MemoryCache(versions=cache_module.VersionStore(path=str(tmp_path / "versions.db")))
+    key = first.key("rows.html", "", None, 10)
+    first.set(key, "rows")
+    tag, changed_at = first.version_tag(), first.changed_at()
+    assert second.version_tag() == tag
+    assert second.changed_at() == changed_at
+
+    # Validators hold still until a write, whichever worker makes it
+    time.sleep(0.1)
+    assert first.version_tag() == tag
+    second.bump_version()
+    assert first.version_tag() != tag
+    assert first.changed_at() > changed_at
+    assert first.get(first.key("rows.html", "", None, 10)) is None
+
+
+def test_memory_cache_ttl_caps_entry_age(load) -> None:
+    cache = load("cache").MemoryCache(ttl=0.5)
+    key = cache.key("rows.html", "", None, 10)
+    cache.set(key, "rows")
+    assert cache.get(key) == "rows"
+    time.sleep(0.6)
+    assert cache.get(key) is None
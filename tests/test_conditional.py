@@ -0,0 +1,13 @@
+def test_json_and_ndjson_have_distinct_etags(load) -> None:
+    client = load("index").app.test_client()
+    response = client.get("/api/v0/contacts", headers={"Accept": "application/json"})
+    assert response.status_code == 200
+    assert "Accept" in response.headers["Vary"]
+    etag = response.headers["ETag"]
+
+    cached = client.get("/api/v0/contacts", headers={"Accept": "application/json", "If-None-Match": etag})
+    assert cached.status_code == 304
+    ndjson = client.get("/api/v0/contacts", headers={"Accept": "application/x-ndjson", "If-None-Match": etag})
+    assert ndjson.status_code == 200
+    assert ndjson.mimetype == "application/x-ndjson"
+    assert ndjson.headers["ETag"] != etag
@@ -0,0 +1,34 @@
+import time
+
+from sqlalchemy import text
+
+
+def test_count_is_bumped_by_writes_and_reloaded_after_ttl(load) -> None:
+    contacts, index = load("contacts", "index", COUNT_CACHE_TTL="0.5")
+    Contact = contacts.Contact
+    assert Contact.count() == 0
+    Contact.bulk_insert(contacts=[Contact(email=f"c{n}@example.com") for n in range(3)])
+    contact = Contact(email="one@example.com")
+    assert contact.save()
+    assert contacts.contact_counter.peek() == 4
+    assert Contact.delete_many(ids=[1, 2]) == 2
+    contact.delete()
+    assert contacts.contact_counter.peek() == 1
+
+    # A write from elsewhere (another process, say) is only picked up once the cached total expires
+    with contacts.get_engine().begin() as connection:
+        connection.execute(text("INSERT INTO contacts (email) VALUES ('other@example.com')"))
+    assert Contact.count() == 1
+    time.sleep(0.6)
+    assert Contact.count() == 2
+    assert index.app.test_client().get("/contacts/count").get_data(as_text=True) == "(2 total Contacts)"
+
+
+def test_count_never_goes_negative(load) -> None:
+    contacts = load("contacts")
+    counter = contacts.ContactCounter(ttl=60)
+    counter.store(value=1)
+    counter.bump(delta=-5)
+    assert counter.peek() == 0
+    counter.invalidate()
+    assert counter.peek() is None
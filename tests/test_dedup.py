@@ -0,0 +1,67 @@
+from sqlalchemy import event
+
+PEOPLE = [
+    ("Jon", "Smith", "555-010-0100", "jon.smith@example.com"),
+    ("John", "Smith", "(555) 010-0100", "jon.smith@example.org"),
+    ("Jane", "Smith", "555-999-0000", "jane@example.com"),
+    ("Ada", "Lovelace", "555-123-4567", "ada@example.com"),
+]
+
+
+def seed(contacts) -> None:
+    Contact = contacts.Contact
+    Contact.bulk_insert(contacts=[Contact(first=first, last=last, phone=phone, email=email)
+                                  for first, last, phone, email in PEOPLE])
+
+
+def test_score_separates_duplicates_from_namesakes(load) -> None:
+    dedup = load("dedup")
+    jon, john, jane, _ = [dedup.normalize(dedup.ContactRecord(n + 1, first, last, phone, email))
+                          for n, (first, last, phone, email) in enumerate(PEOPLE)]
+    value, reasons = dedup.score(jon, john)
+    assert value >= dedup.DEDUP_THRESHOLD
+    assert reasons == ["last", "phone", "email"]
+    assert dedup.score(jon, jane)[0] < dedup.DEDUP_THRESHOLD
+    # The length bound skips the string matching for pairs that can't reach the threshold
+    assert dedup.score(jon, jane, threshold=0.99) == (0.0, [])
+    assert dedup.blocking_keys(dedup.ContactRecord(1, "Jon", "Smith", "555-010-0100", None)) == \
+        ["n:smith:j", "p:5550100100"]
+
+
+def test_full_run_finds_pairs_and_commits_per_page(load, monkeypatch) -> None:
+    contacts, dedup = load("contacts", "dedup")
+    seed(contacts)
+    monkeypatch.setattr(dedup, "DEDUP_PAGE_SIZE", 2)
+    commits: list[int] = []
+    event.listen(contacts.get_engine(), "commit", lambda connection: commits.append(1))
+
+    result = dedup.Deduplicator(workers=1).run()
+    assert (result["mode"], result["contacts"], result["candidates"]) == ("full", 4, 1)
+    # Run row, block reset, two pages of contacts plus the empty last read, candidates, run update
+    assert len(commits) >= 6
+    candidate, = dedup.list_candidates()
+    assert (candidate["contact"]["id"], candidate["duplicate"]["id"]) == (1, 2)
+
+    # A second run keeps the pending pair rather than adding it again
+    assert dedup.Deduplicator(workers=1).run()["candidates"] == 0
+    assert dedup.Deduplicator(workers=1).run(incremental=True)["contacts"] == 0
+
+
+def test_merge_fills_blanks_and_deletes_the_duplicate(load) -> None:
+    contacts, dedup = load("contacts", "dedup")
+    Contact = contacts.Contact
+    Contact.bulk_insert(contacts=[Contact(first="Jon", last="Smith", phone=None, email="jon@example.com"),
+                                  Contact(first="John", last="Smith", phone="555-010-0100", email="john@example.com")])
+    with contacts.get_engine().begin() as connection:
+        dedup.metadata.create_all(connection, tables=dedup.DEDUP_TABLES)
+        connection.execute(dedup.candidates_table.insert(), [
+            {"contact_id": 1, "duplicate_id": 2, "score": 0.9, "reasons": "last"}])
+
+    assert dedup.review_candidate(candidate_id=1, merge=True) == {"id": 1, "status": "merged", "kept": 1,
+                                                                  "deleted": 2}
+    kept = Contact.find(1)
+    assert (kept.first, kept.phone, kept.email) == ("Jon", "555-010-0100", "jon@example.com")
+    assert Contact.find(2) is None
+    assert [contact.id for contact in Contact.search(text="5550100100")] == [1]
+    # Reviewed pairs can't be reviewed again
+    assert dedup.review_candidate(candidate_id=1, merge=False) is None
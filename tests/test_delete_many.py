@@ -0,0 +1,25 @@
+def test_delete_many_counts_only_deleted_rows(load) -> None:
+    contacts = load("contacts")
+    Contact = contacts.Contact
+    count = contacts.DELETE_BATCH_SIZE + 10
+    Contact.bulk_insert(contacts=[Contact(email=f"c{n}@example.com") for n in range(count)])
+    # Spans two IN batches; repeated and unknown ids are not counted
+    ids = list(range(1, count + 1)) + [1, 2, count + 100]
+    assert Contact.delete_many(ids=ids) == count
+    assert Contact.count() == 0
+    assert Contact.delete_many(ids=[1]) == 0
+    assert Contact.delete_many(ids=[]) == 0
+
+
+def test_delete_routes_report_deleted_rows(load) -> None:
+    contacts, index = load("contacts", "index")
+    Contact = contacts.Contact
+    Contact.bulk_insert(contacts=[Contact(email=f"c{n}@example.com") for n in range(4)])
+    client = index.app.test_client()
+    response = client.delete("/api/v0/contacts", json={"ids": [1, 2, 99]})
+    assert response.get_json() == {"success": True, "deleted": 2}
+    assert client.delete("/api/v0/contacts", json={"ids": ["x"]}).status_code == 400
+
+    page = client.delete("/contacts/", data={"selected_contact_ids": ["3"]})
+    assert "c2@example.com" not in page.get_data(as_text=True)
+    assert [contact.id for contact in Contact.all()] == [4]
@@ -0,0 +1,20 @@
+import time
+
+
+def test_email_index_loads_in_the_background(load) -> None:
+    contacts = load("contacts", EMAIL_INDEX="1")
+    Contact, email_index = contacts.Contact, contacts.email_index
+    Contact(first="Ada", last="Lovelace", email="ada@example.com").save()
+
+    # The first check does not wait for the load: every email is a possible hit until it finishes
+    assert email_index.may_contain(email="free@example.com")
+    deadline = time.time() + 10
+    while email_index.may_contain(email="free@example.com"):
+        assert time.time() < deadline
+        time.sleep(0.05)
+    assert email_index.may_contain(email="ada@example.com")
+
+    contact = Contact(email="ada@example.com")
+    assert not contact.validate_email()
+    assert contact.errors["email"] == "Email Must Be Unique"
+    assert Contact(email="free@example.com").validate_email()
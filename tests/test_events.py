@@ -0,0 +1,16 @@
+def test_wsgi_event_streams_return_at_once_with_a_resume_id(load) -> None:
+    contacts, events, index = load("contacts", "events", "index")
+    contacts.Contact(first="Ada", email="ada@example.com").save()
+    first_id = events.broker.last_id()
+
+    # A WSGI stream hands its thread back once nothing is pending and leaves the browser an id to resume from
+    messages = list(index.event_stream(channels={"contacts"}, archive_job=None, last_event_id=None, wait=False))
+    assert messages[0] == "retry: 3000\n\n"
+    assert messages[-1] == f"id: {first_id}\n\n"
+
+    contacts.Contact(first="Alan", email="alan@example.com").save()
+    with index.app.app_context():
+        replayed = list(index.event_stream(channels={"contacts"}, archive_job=None, last_event_id=first_id,
+                                           wait=False))
+    assert any(message.startswith(f"id: {first_id + 1}\nevent: contacts") for message in replayed)
+    assert replayed[-1] == f"id: {first_id + 1}\n\n"
@@ -0,0 +1,39 @@
+def test_search_ranks_better_matches_first(load) -> None:
+    contacts = load("contacts")
+    Contact = contacts.Contact
+    assert contacts.search_index.is_available()
+    Contact.bulk_insert(contacts=[Contact(first="Jo", last="Smith", email="jo@example.com"),
+                                  Contact(first="Ann", last="Jones", email="ann@example.com"),
+                                  Contact(first="Smith", last="Smith", email="smith@example.com")])
+    # bm25 favours the row that mentions the term in every field over the earlier, single mention
+    assert [contact.email for contact in Contact.search(text="smith")] == ["smith@example.com", "jo@example.com"]
+    # Terms match as prefixes, and every term must match
+    assert [contact.email for contact in Contact.search(text="smi jo")] == ["jo@example.com"]
+
+
+def test_search_pages_by_offset_cursor(load) -> None:
+    contacts = load("contacts")
+    Contact = contacts.Contact
+    Contact.bulk_insert(contacts=[Contact(first="Sam", last=f"Miller{n}", email=f"sam{n}@example.com")
+                                  for n in range(5)])
+    seen, after = [], None
+    while True:
+        page = Contact.search(text="sam", after=after, size=2)
+        seen.extend(contact.email for contact in page)
+        after = contacts.next_cursor(contacts=page, size=2, offset=contacts.decode_cursor(after) or 0)
+        if after is None:
+            break
+    assert sorted(seen) == [f"sam{n}@example.com" for n in range(5)]
+    assert len(seen) == len(set(seen))
+
+
+def test_search_index_follows_updates_and_deletes(load) -> None:
+    Contact = load("contacts").Contact
+    contact = Contact(first="Grace", last="Hopper", email="grace@example.com")
+    assert contact.save()
+    contact.update(first="Grace", last="Murray", phone=None, email="grace@example.com")
+    assert contact.save()
+    assert Contact.search(text="Hopper") == []
+    assert [found.id for found in Contact.search(text="Murray")] == [contact.id]
+    contact.delete()
+    assert Contact.search(text="Murray") == []
@@ -0,0 +1,37 @@
+import io
+
+
+def test_import_reports_invalid_utf8_per_row(load) -> None:
+    contacts, index = load("contacts", "index")
+    client = index.app.test_client()
+    body = (b"first,last,phone,email\n"
+            b"Ada,Lovelace,555-0100,ada@example.com\n"
+            b"Bad,\xff\xfe,555-0101,bad@example.com\n"
+            b"Alan,Turing,555-0102,alan@example.com\n")
+    response = client.post("/api/v0/contacts/import", data=body, content_type="text/csv")
+    assert response.status_code == 200
+    report = response.get_json()
+    assert (report["created"], report["failed"]) == (2, 1)
+    assert report["errors"] == [{"row": 2, "errors": {"row": "Invalid UTF-8"}}]
+
+    lines = b'{"email": "grace@example.com"}\n\xc3\x28\n'
+    response = client.post("/api/v0/contacts/import?format=ndjson",
+                           data={"file": (io.BytesIO(lines), "contacts.ndjson")})
+    assert response.status_code == 200
+    assert response.get_json()["errors"] == [{"row": 2, "errors": {"row": "Invalid UTF-8"}}]
+    assert [contact.email for contact in contacts.Contact.search("grace@example.com")] == ["grace@example.com"]
+
+    ok = client.post("/api/v0/contacts/import", data=b"email\nlin@example.com\n", content_type="text/csv")
+    assert ok.status_code == 200
+    assert ok.get_json()["created"] == 1
+
+
+def test_import_rejects_values_that_are_not_strings(load) -> None:
+    contacts, index = load("contacts", "index")
+    client = index.app.test_client()
+    lines = b'{"email": "ada@example.com", "phone": 5550100}\n{"email": "alan@example.com", "first": "Alan"}\n'
+    response = client.post("/api/v0/contacts/import?format=ndjson", data=lines, content_type="application/x-ndjson")
+    assert response.status_code == 200
+    report = response.get_json()
+    assert (report["created"], report["failed"]) == (1, 1)
+    assert report["errors"] == [{"row": 1, "errors": {"phone": "Must be a string"}}]
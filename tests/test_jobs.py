@@ -0,0 +1,30 @@
+import os
+import time
+
+
+def test_stale_running_jobs_are_found_and_cleaned_up(load) -> None:
+    jobs = load("jobs")
+    job_store = jobs.job_store
+    job = job_store.create(kind="archive")
+    part = os.path.join(jobs.JOB_DIR, job.id + ".csv.part")
+    open(part, "w").close()
+
+    # A job whose process died keeps status Running but stops getting heartbeats
+    assert job_store.stale(after=60) == []
+    time.sleep(0.2)
+    assert job_store.stale(after=0.1) == [job.id]
+    job_store.beat(job_ids=[job.id])
+    assert job_store.stale(after=0.1) == []
+
+    job_store.update(job.id, status="Failed", error="Job stopped responding")
+    assert job_store.expired(ttl=0) == [job.id]
+    job_store.delete(job.id)
+    assert not os.path.exists(part)
+
+
+def test_running_archive_offers_cancel(load) -> None:
+    contacts, index = load("contacts", "index")
+    archiver = contacts.Archiver(job=contacts.job_store.create(kind="archive"))
+    with index.app.app_context():
+        html = index.app.jinja_env.get_template("archive_ui.html").render(archiver=archiver)
+    assert 'hx-delete="/contacts/archive">Cancel' in html
@@ -0,0 +1,29 @@
+import logging
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+
+def test_failed_queries_are_logged(load, caplog) -> None:
+    contacts = load("contacts")
+    with contacts.get_engine().begin() as connection:
+        connection.execute(text("DROP TABLE contacts"))
+    with caplog.at_level(logging.ERROR, logger="contact_app.contacts"):
+        assert contacts.Contact.find(1) is None
+    record = caplog.records[-1]
+    assert record.getMessage() == "Contact.find failed"
+    assert record.exc_info is not None
+
+
+def test_integrity_errors_are_counted_but_not_logged(load, caplog) -> None:
+    contacts, metrics = load("contacts", "metrics")
+    insert = text("INSERT INTO contacts (id, email) VALUES (1, 'ada@example.com')")
+    with contacts.get_engine().begin() as connection:
+        connection.execute(insert)
+    with caplog.at_level(logging.WARNING, logger="contact_app.metrics"):
+        with pytest.raises(IntegrityError):
+            with contacts.get_engine().begin() as connection:
+                connection.execute(insert)
+    assert not [record for record in caplog.records if record.getMessage().startswith("Statement failed")]
+    assert metrics.metrics.value("db_errors_total", error="IntegrityError") == 1
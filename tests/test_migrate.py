@@ -0,0 +1,30 @@
+import sqlite3
+import time
+
+from sqlalchemy import inspect, text
+
+OLD_SCHEMA = ("CREATE TABLE contacts (id INTEGER PRIMARY KEY AUTOINCREMENT, first VARCHAR, last VARCHAR, "
+              "phone VARCHAR, email VARCHAR UNIQUE)")
+
+
+def test_auto_migrate_backfills_in_background(load, tmp_path) -> None:
+    connection = sqlite3.connect(tmp_path / "contacts.db")
+    connection.execute(OLD_SCHEMA)
+    connection.execute("INSERT INTO contacts (first, last, phone, email) "
+                       "VALUES ('Old', 'Row', '(555) 123-4567 x89', 'Old.Row@Example.com')")
+    connection.commit()
+    connection.close()
+
+    contacts = load("contacts")
+    engine = contacts.get_engine()
+    # The first use only adds columns; the table scans run as a background job
+    assert "phone_digits" in {column["name"] for column in inspect(engine).get_columns("contacts")}
+    deadline = time.monotonic() + 30
+    while contacts.upgrade_pending(engine_=engine) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    with engine.connect() as connection:
+        row = connection.execute(text("SELECT phone_digits, email_lower, updated_at FROM contacts")).one()
+    assert row[:2] == ("5551234567", "old.row@example.com")
+    assert row[2] is not None
+    assert "contacts_email_lower" in {index["name"] for index in inspect(engine).get_indexes("contacts")}
+    assert [contact.email for contact in contacts.Contact.search(text="Row")] == ["Old.Row@Example.com"]
@@ -0,0 +1,53 @@
+def seed(contacts, count: int) -> None:
+    Contact = contacts.Contact
+    Contact.bulk_insert(contacts=[Contact(first=f"First{n}", last=f"Last{n}", email=f"c{n}@example.com")
+                                  for n in range(count)])
+
+
+def test_all_pages_by_cursor(load) -> None:
+    contacts = load("contacts")
+    seed(contacts, count=25)
+    pages, after = [], None
+    while True:
+        page = contacts.Contact.all(after=after, size=10)
+        pages.append([contact.id for contact in page])
+        after = contacts.next_cursor(contacts=page, size=10)
+        if after is None:
+            break
+    assert pages == [list(range(1, 11)), list(range(11, 21)), list(range(21, 26))]
+
+
+def test_cursor_is_stable_across_deletes(load) -> None:
+    contacts = load("contacts")
+    seed(contacts, count=25)
+    first = contacts.Contact.all(size=10)
+    after = contacts.next_cursor(contacts=first, size=10)
+    # Deleting rows on an earlier page must not shift the next one, as OFFSET would
+    assert contacts.Contact.delete_many(ids=[2, 3]) == 2
+    assert [contact.id for contact in contacts.Contact.all(after=after, size=10)] == list(range(11, 21))
+
+
+def test_invalid_cursor_and_size_fall_back(load) -> None:
+    contacts = load("contacts")
+    assert contacts.decode_cursor("not a cursor!") is None
+    assert contacts.decode_cursor(contacts.encode_cursor(42)) == 42
+    assert contacts.page_size("abc") == contacts.PAGE_SIZE
+    assert contacts.page_size(10 ** 6) == contacts.MAX_PAGE_SIZE
+    assert contacts.page_size(0) == 1
+
+
+def test_json_api_and_load_more_follow_the_cursor(load) -> None:
+    contacts, index = load("contacts", "index")
+    seed(contacts, count=15)
+    client = index.app.test_client()
+    first = client.get("/api/v0/contacts?size=10").get_json()
+    assert len(first["contacts"]) == 10
+    second = client.get(f"/api/v0/contacts?size=10&after={first['next']}").get_json()
+    assert [contact["id"] for contact in second["contacts"]] == list(range(11, 16))
+    assert second["next"] is None
+
+    rows = client.get(f"/contacts?size=10&after={first['next']}", headers={"HX-Trigger": "load-more"})
+    html = rows.get_data(as_text=True)
+    assert "c14@example.com" in html
+    assert "load-more" not in html
+    assert "load-more" in client.get("/contacts?size=10", headers={"HX-Trigger": "load-more"}).get_data(as_text=True)
@@ -0,0 +1,29 @@
+import json
+
+
+def test_reads_return_slim_records(load) -> None:
+    contacts = load("contacts")
+    Contact = contacts.Contact
+    Contact.bulk_insert(contacts=[Contact(first="Zoë", last="Ünal", phone="555-0100", email="zoe@example.com")])
+    record = Contact.all()[0]
+    assert type(record) is contacts.ContactRecord
+    assert record.to_dict() == {"id": 1, "first": "Zoë", "last": "Ünal", "phone": "555-0100",
+                                "email": "zoe@example.com"}
+    assert Contact.search(text="Zoë") == [record]
+
+    contact = Contact.find(1)
+    assert not hasattr(contact, "__dict__")
+    assert contact.to_dict() == record.to_dict()
+    assert json.loads(str(contact)) == record.to_dict()
+    assert "Zoë" in str(contact)
+
+
+def test_json_api_serializes_rows_directly(load) -> None:
+    contacts, index = load("contacts", "index")
+    Contact = contacts.Contact
+    Contact.bulk_insert(contacts=[Contact(first="Ada", email="ada@example.com")])
+    client = index.app.test_client()
+    expected = {"id": 1, "first": "Ada", "last": None, "phone": None, "email": "ada@example.com"}
+    assert client.get("/api/v0/contacts").get_json() == {"contacts": [expected], "next": None}
+    assert client.get("/api/v0/contacts/1").get_json() == expected
+    assert client.get("/api/v0/contacts/2").status_code == 404
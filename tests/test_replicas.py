@@ -0,0 +1,59 @@
+import shutil
+import time
+from threading import Thread
+
+
+def test_batch_reads_from_primary(load, tmp_path) -> None:
+    primary, replica = tmp_path / "contacts.db", tmp_path / "replica.db"
+    # A long read-your-writes window would hide the bug, so make reads eligible for the replica at once
+    contacts = load("contacts", READ_CONNECTION_STRINGS=f"sqlite:///{replica}", READ_YOUR_WRITES_SECONDS="0",
+                    REPLICA_CHECK_INTERVAL="0", REPLICA_RETRY_INTERVAL="0")
+    Contact = contacts.Contact
+    Contact.bulk_insert(contacts=[Contact(first="Old", last="Row", phone="555-0100", email="old@example.com")])
+    contacts.get_engine().dispose()
+    shutil.copy(primary, replica)
+
+    # Written after the replica copy, so it exists only on the primary
+    Contact.bulk_insert(contacts=[Contact(first="New", last="Row", phone="555-0101", email="new@example.com")])
+    Contact.batch(operations=[{"op": "update", "id": 1, "contact": {"phone": "555-0199"}}])
+    # Plain reads do go to the replica, which doesn't have the new row yet
+    assert Contact.find(2) is None
+
+    results = Contact.batch(operations=[{"op": "update", "id": 2, "contact": {"first": "Newer"}},
+                                        {"op": "update", "id": 1, "contact": {"first": "Older"}}])
+    assert [result["status"] for result in results] == [200, 200]
+    # The partial update must not copy the replica's stale phone back
+    assert results[1]["contact"]["phone"] == "555-0199"
+
+
+def read_all_in_thread(Contact) -> list[str]:
+    # A fresh thread gets its own session, with no recent write of its own to keep it on the primary
+    emails: list[str] = []
+    thread = Thread(target=lambda: emails.extend(contact.email for contact in Contact.all()))
+    thread.start()
+    thread.join()
+    return emails
+
+
+def test_cache_keeps_read_your_writes(load, tmp_path) -> None:
+    primary, replica = tmp_path / "contacts.db", tmp_path / "replica.db"
+    contacts = load("contacts", READ_CONNECTION_STRINGS=f"sqlite:///{replica}", READ_YOUR_WRITES_SECONDS="0.5",
+                    REPLICA_CHECK_INTERVAL="0", REPLICA_RETRY_INTERVAL="0")
+    Contact = contacts.Contact
+    Contact.bulk_insert(contacts=[Contact(first="Old", last="Row", phone="555-0100", email="old@example.com")])
+    contacts.get_engine().dispose()
+    shutil.copy(primary, replica)
+
+    Contact.bulk_insert(contacts=[Contact(first="New", last="Row", phone="555-0101", email="new@example.com")])
+    # Another session reads the lagging replica under the version the write just bumped...
+    assert read_all_in_thread(Contact) == ["old@example.com"]
+    # ...which must not hide the write from the session that made it
+    assert [contact.email for contact in Contact.all()] == ["old@example.com", "new@example.com"]
+
+    # Once the replica catches up, nobody is served the stale page from the cache
+    time.sleep(0.5)
+    contacts.get_engine().dispose()
+    for replica_ in contacts.replicas.replicas:
+        replica_.engine().dispose()
+    shutil.copy(primary, replica)
+    assert read_all_in_thread(Contact) == ["old@example.com", "new@example.com"]
@@ -0,0 +1,26 @@
+import pytest
+
+CONTACTS = [
+    ("Ann", "One", "+1-259-555-0134", "ann@example.com"),
+    ("Bob", "Two", "001-499-555-0199x12", "Bob.Two@Example.com"),
+    ("Cy", "Three", "(555) 123-4567 x89", "cy@example.com"),
+    ("Di", "Four", "843-747-5437", "di@example.com"),
+]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("+1-259", ["ann@example.com"]),
+    ("12595550134", ["ann@example.com"]),
+    ("001-499", ["Bob.Two@Example.com"]),
+    ("5551234", ["cy@example.com"]),
+    ("123-4567", ["cy@example.com"]),
+    ("5437", ["di@example.com"]),
+    ("bob.two@example.com", ["Bob.Two@Example.com"]),
+    ("BOB.TWO@", ["Bob.Two@Example.com"]),
+    ("Three", ["cy@example.com"]),
+])
+def test_phone_and_email_lookups(load, query, expected) -> None:
+    Contact = load("contacts").Contact
+    Contact.bulk_insert(contacts=[Contact(first=first, last=last, phone=phone, email=email)
+                                  for first, last, phone, email in CONTACTS])
+    assert [contact.email for contact in Contact.search(text=query)] == expected
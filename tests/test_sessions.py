@@ -0,0 +1,38 @@
+import threading
+
+
+def test_each_request_gets_a_session_that_is_removed_afterwards(load) -> None:
+    contacts, index = load("contacts", "index")
+    seen: list = []
+
+    @index.app.route("/test/session")
+    def current_session() -> str:
+        seen.append(contacts.session())
+        return str(len(contacts.Contact.all()))
+
+    client = index.app.test_client()
+    assert client.get("/test/session").status_code == 200
+    assert not contacts.session.registry.has()
+    client.get("/test/session")
+    assert seen[0] is not seen[1]
+    # The request's connection went back to the pool
+    assert contacts.get_engine().pool.checkedout() == 0
+
+
+def test_threads_never_share_a_session(load) -> None:
+    contacts = load("contacts")
+    sessions: list = []
+    thread = threading.Thread(target=lambda: sessions.append(contacts.session()))
+    thread.start()
+    thread.join()
+    assert sessions[0] is not contacts.session()
+
+
+def test_pool_options_follow_the_pool_class(load, tmp_path) -> None:
+    contacts, index = load("contacts", "index", DB_POOL_SIZE="3", DB_MAX_OVERFLOW="2")
+    options = contacts.engine_options(f"sqlite:///{tmp_path / 'file.db'}")
+    assert (options["pool_size"], options["max_overflow"]) == (3, 2)
+    # In-memory SQLite uses a single-connection pool that takes no sizing options
+    assert "pool_size" not in contacts.engine_options("sqlite://")
+    stats = index.app.test_client().get("/api/v0/pool").get_json()
+    assert (stats["pool"], stats["size"]) == ("QueuePool", 3)